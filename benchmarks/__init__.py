@@ -0,0 +1,2 @@
+# synthetic TextGrid corpora (corpus.py) and the stage benchmarks of the pipeline (run.py);
+# run from the repository root, e.g. python -m benchmarks.run
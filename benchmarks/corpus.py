@@ -0,0 +1,129 @@
+import argparse
+import os
+
+import numpy as np
+
+# ThinkAnswer marks are T (think) or A (answer), the condition and the kind of question, e.g. "Tpo", "Apo"
+CONDITIONS = ('f', 'p', 's')
+KINDS = ('f', 'm', 'o')
+# gaze directions are 0-9; 5 is by far the most frequent one in the recorded sessions
+DIRECTIONS = 10
+FIVE_SHARE = 0.3
+# share of fixations followed by a short uncoded ("") interval, and of directions coded twice in a row
+GAP_SHARE = 0.3
+REPEAT_SHARE = 0.01
+
+
+def gaze_tier(rng, fixations):
+    # xmins, xmaxs and marks of a Blickrichtungen tier with the given number of fixations
+    # random steps of 1-9 never stay on a direction; then a share of the fixations go to 5 and a few
+    # directions are coded twice, like the encoding sometimes did
+    steps = rng.integers(1, DIRECTIONS, fixations)
+    directions = np.cumsum(steps) % DIRECTIONS
+    five = rng.random(fixations) < FIVE_SHARE
+    directions[five] = 5
+    repeat = np.flatnonzero(rng.random(fixations) < REPEAT_SHARE)
+    directions[repeat[repeat > 0]] = directions[repeat[repeat > 0] - 1]
+
+    durations = np.round(0.05 + rng.exponential(1.2, fixations), 3)
+    gaps = np.where(rng.random(fixations) < GAP_SHARE, 0.02, 0.0)
+    marks = np.empty(2 * fixations, dtype=object)
+    marks[0::2] = [str(direction) for direction in directions]
+    marks[1::2] = ''
+    lengths = np.empty(2 * fixations)
+    lengths[0::2] = durations
+    lengths[1::2] = gaps
+    keep = lengths > 0
+    ends = np.round(np.cumsum(lengths[keep]), 3)
+    starts = np.concatenate([[0.0], ends[:-1]])
+    return starts, ends, list(marks[keep])
+
+
+def thinkanswer_tier(rng, duration, questions):
+    # a pause, a think and an answer interval per question, filling [0, duration]
+    # questions of roughly equal length, their boundaries moved by up to a quarter of it
+    bounds = np.linspace(0.0, duration, questions + 1)
+    bounds[1:-1] += rng.uniform(-0.25, 0.25, questions - 1) * duration / questions
+    spans = np.diff(bounds)
+    cuts = bounds[:-1, None] + spans[:, None] * np.array([0.0, 0.05, 0.55])[None, :]
+    starts = np.round(cuts.reshape(-1), 3)
+    ends = np.concatenate([starts[1:], [duration]])
+    conditions = rng.integers(0, len(CONDITIONS), questions)
+    kinds = rng.integers(0, len(KINDS), questions)
+    marks = []
+    for condition, kind in zip(conditions, kinds):
+        marks += ['', 'T' + CONDITIONS[condition] + KINDS[kind], 'A' + CONDITIONS[condition] + KINDS[kind]]
+    keep = ends > starts
+    return starts[keep], ends[keep], [mark for mark, kept in zip(marks, keep) if kept]
+
+
+def _number(value):
+    return repr(round(float(value), 3))
+
+
+def _string(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def write_textgrid(filename, tiers, short=False):
+    # writes interval tiers [(name, xmins, xmaxs, marks)] as a Praat text TextGrid, long or short format
+    xmin = min(tier[1][0] for tier in tiers)
+    xmax = max(tier[2][-1] for tier in tiers)
+    lines = ['File type = "ooTextFile"', 'Object class = "TextGrid"', '']
+    if short:
+        lines += [_number(xmin), _number(xmax), '<exists>', str(len(tiers))]
+    else:
+        lines += ['xmin = ' + _number(xmin), 'xmax = ' + _number(xmax), 'tiers? <exists>',
+                  'size = %d' % len(tiers), 'item []:']
+    for n, (name, xmins, xmaxs, marks) in enumerate(tiers, 1):
+        if short:
+            lines += ['"IntervalTier"', _string(name), _number(xmins[0]), _number(xmaxs[-1]), str(len(marks))]
+            for start, end, mark in zip(xmins, xmaxs, marks):
+                lines += [_number(start), _number(end), _string(mark)]
+        else:
+            lines += ['    item [%d]:' % n, '        class = "IntervalTier"', '        name = ' + _string(name),
+                      '        xmin = ' + _number(xmins[0]), '        xmax = ' + _number(xmaxs[-1]),
+                      '        intervals: size = %d' % len(marks)]
+            for i, (start, end, mark) in enumerate(zip(xmins, xmaxs, marks), 1):
+                lines += ['        intervals [%d]:' % i, '            xmin = ' + _number(start),
+                          '            xmax = ' + _number(end), '            text = ' + _string(mark)]
+    with open(filename, 'w', encoding='utf-8') as text:
+        text.write('\n'.join(lines) + '\n')
+
+
+def write_participant(directory, vp_nr, fixations, questions, seed=0, short=False):
+    # Blickrichtungen and ThinkAnswer grid of one synthetic participant, laid out like VPs/;
+    # returns the paths of both grids
+    rng = np.random.default_rng(seed)
+    starts, ends, marks = gaze_tier(rng, fixations)
+    ta_starts, ta_ends, ta_marks = thinkanswer_tier(rng, ends[-1], max(1, questions))
+
+    paths = [os.path.join(directory, 'Blickrichtungen', vp_nr + '_Blickrichtungen.TextGrid'),
+             os.path.join(directory, 'ThinkAnswer', vp_nr + '_TA.TextGrid')]
+    for path, tier in zip(paths, [('Blickrichtung', starts, ends, marks),
+                                  ('Think_and_answer', ta_starts, ta_ends, ta_marks)]):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_textgrid(path, [tier], short)
+    return paths
+
+
+def write_corpus(directory, participants, fixations, questions, seed=0, short=False):
+    # participants vp11, vp12, vp21, ... (two per dyad), every one with its own random stream
+    vp_nrs = ['vp%d%d' % (n // 2 + 1, n % 2 + 1) for n in range(participants)]
+    for n, vp_nr in enumerate(vp_nrs):
+        write_participant(directory, vp_nr, fixations, questions, seed + n, short)
+    return vp_nrs
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write a synthetic corpus of Blickrichtungen and ThinkAnswer '
+                                                 'TextGrids, laid out like VPs/')
+    parser.add_argument('directory')
+    parser.add_argument('--participants', type=int, default=13)
+    parser.add_argument('--fixations', type=int, default=1000, help='gaze intervals per session')
+    parser.add_argument('--questions', type=int, default=21, help='ThinkAnswer questions per session')
+    parser.add_argument('--short', action='store_true', help="write Praat's short text format")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    write_corpus(args.directory, args.participants, args.fixations, args.questions, args.seed, args.short)
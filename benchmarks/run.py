@@ -0,0 +1,165 @@
+import argparse
+import contextlib
+import csv
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import render
+import rqa
+from gaze import count_transitions, gaze_codes, transition_matrix
+from main import (CONDITION2COLOR, NUMBER2COLOR, RQA_LINE_LENGTHS, RQA_RADIUS, RQA_THEILER_CORRECTOR,
+                  RQA_TILE_SIZE, TA2COLOR, load_participant, recurrence_points, rqa_result_to_dict,
+                  write_movementpattern_to_csv)
+from praatclasses import read_textgrid
+from benchmarks.corpus import write_participant
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+# gaze intervals per session
+SIZES = (100, 1000, 10000, 100000)
+# the recorded sessions have about ten gaze intervals per ThinkAnswer question
+FIXATIONS_PER_QUESTION = 10
+# stages whose cost grows with the square of the recurrence points only run up to this many points
+QUADRATIC_LIMITS = {'rqa categorical': 20000, 'rqa native': 10000, 'rendering': 4000}
+# measures compared with the baseline besides the timings
+CHECKED_MEASURES = ("Recurrence rate (RR)", "Determinism (DET)", "Laminarity (LAM)",
+                    "Entropy diagonal lines (L_entr)")
+# a stage is a regression if it is this much slower than the baseline, and by at least MIN_SECONDS
+TOLERANCE = 0.5
+MIN_SECONDS = 0.005
+
+
+def best_of(repeat, function, *args):
+    # (smallest wall time, result of the last call)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def quiet(function, *args):
+    # recurrence_points prints its summary line of unmatched gaze intervals and the question counts, which would
+    # clutter the timings
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        return function(*args)
+
+
+def write_csv(directory, pattern_matrix, counts, result_dict):
+    write_movementpattern_to_csv(os.path.join(directory, 'bench_tabelle.csv'), pattern_matrix, counts)
+    with open(os.path.join(directory, 'bench_results.csv'), 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=['VP'] + list(result_dict.keys()))
+        writer.writeheader()
+        writer.writerow(dict(result_dict, VP='bench'))
+
+
+def rqa_result(matrix):
+    return rqa_result_to_dict(rqa.RQAResult.from_matrix(matrix, RQA_THEILER_CORRECTOR, **RQA_LINE_LENGTHS))
+
+
+def benchmark_size(fixations, repeat=3, seed=0, directory=None):
+    # stage timings (seconds) and checked results for one synthetic session of the given length
+    stages = dict()
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        questions = max(1, fixations // FIXATIONS_PER_QUESTION)
+        long_paths = write_participant(os.path.join(tmp, 'long'), 'vp11', fixations, questions, seed)
+        short_paths = write_participant(os.path.join(tmp, 'short'), 'vp11', fixations, questions, seed, short=True)
+
+        stages['parse long'], _ = best_of(repeat, lambda: [read_textgrid(path) for path in long_paths])
+        stages['parse short'], _ = best_of(repeat, lambda: [read_textgrid(path) for path in short_paths])
+        stages['load'], (br_tier, ta_tier) = best_of(repeat, load_participant, long_paths[0], long_paths[1], None)
+        stages['transitions'], pattern_matrix = best_of(repeat, transition_matrix, br_tier)
+        stages['alignment'], points = best_of(repeat, quiet, recurrence_points, br_tier, ta_tier)
+
+        series = np.array([float(point[0]) for point in points])
+        results = {'points': len(series)}
+        result_dict = None
+        if len(series) <= QUADRATIC_LIMITS['rqa categorical']:
+            stages['rqa categorical'], result_dict = best_of(
+                repeat, lambda: rqa_result(rqa.CategoricalRecurrence(series, RQA_RADIUS)))
+            results.update((measure, result_dict[measure]) for measure in CHECKED_MEASURES)
+        if len(series) <= QUADRATIC_LIMITS['rqa native']:
+            stages['rqa native'], native_dict = best_of(
+                repeat, lambda: rqa_result(rqa.TiledRecurrenceMatrix(series, RQA_RADIUS, tile_size=RQA_TILE_SIZE)))
+            result_dict = result_dict or native_dict
+        if len(series) <= QUADRATIC_LIMITS['rendering']:
+            matrix = rqa.TiledRecurrenceMatrix(series, RQA_RADIUS, tile_size=RQA_TILE_SIZE)
+            stages['rendering'], _ = best_of(repeat, lambda: render.save_image(
+                render.numbered_recurrence_plot(matrix, points, NUMBER2COLOR, TA2COLOR, CONDITION2COLOR),
+                os.path.join(tmp, 'bench_recPlot_numbered.png')))
+        if result_dict is not None:
+            counts = count_transitions(gaze_codes(br_tier))
+            stages['csv'], _ = best_of(repeat, write_csv, tmp, pattern_matrix, counts, result_dict)
+    return {'stages': stages, 'results': results}
+
+
+def compare(run, baseline, tolerance=TOLERANCE):
+    # lines of the comparison table and the number of regressions
+    lines = ['%8s %-16s %10s %10s %7s' % ('size', 'stage', 'seconds', 'baseline', 'ratio')]
+    regressions = 0
+    for size, measured in run['sizes'].items():
+        reference = baseline.get('sizes', {}).get(size, {'stages': {}, 'results': {}})
+        for stage, seconds in measured['stages'].items():
+            before = reference['stages'].get(stage)
+            if before is None:
+                lines.append('%8s %-16s %10.4f %10s %7s' % (size, stage, seconds, '-', '-'))
+                continue
+            slower = seconds > before * (1 + tolerance) and seconds - before > MIN_SECONDS
+            regressions += slower
+            lines.append('%8s %-16s %10.4f %10.4f %7.2f%s' % (size, stage, seconds, before, seconds / before,
+                                                             '  REGRESSION' if slower else ''))
+        for measure, value in measured['results'].items():
+            before = reference['results'].get(measure)
+            if before is not None and not np.isclose(value, before, rtol=1e-9, atol=1e-12):
+                regressions += 1
+                lines.append('%8s %-16s changed from %r to %r' % (size, measure, before, value))
+    return lines, regressions
+
+
+def run_benchmarks(sizes=SIZES, repeat=3, seed=0):
+    run = {'python': sys.version.split()[0], 'machine': platform.machine(), 'processor': platform.processor(),
+           'repeat': repeat, 'seed': seed, 'sizes': dict()}
+    for size in sizes:
+        print('%d gaze intervals ...' % size, file=sys.stderr)
+        run['sizes'][str(size)] = benchmark_size(size, repeat, seed)
+    return run
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time the stages of the pipeline on synthetic sessions of '
+                                                 'growing length and compare them with a recorded baseline')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='gaze intervals per session')
+    parser.add_argument('--repeat', type=int, default=3, help='the best of this many runs is taken')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='record this run as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help='relative slowdown of a stage that counts as a regression (default: %(default)s)')
+    parser.add_argument('--output', help='also write the timings of this run to this JSON file')
+    args = parser.parse_args()
+
+    run = run_benchmarks(args.sizes, args.repeat, args.seed)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(run, file, indent=1)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(run, file, indent=1)
+        print('baseline written to ' + args.baseline)
+        sys.exit(0)
+
+    baseline = dict()
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    lines, regressions = compare(run, baseline, args.tolerance)
+    print('\n'.join(lines))
+    if regressions:
+        print('%d regressions' % regressions)
+        sys.exit(1)
@@ -0,0 +1,102 @@
+import argparse
+import csv
+import os
+
+import numpy as np
+
+import rqa
+from gaze import NUMBER_OF_DIRECTIONS, count_grouped_transitions, direction_code, gaze_events, relative_frequencies
+from main import (ANALYSEN_PATH, CACHE_PATH, RQA_LINE_LENGTHS, RQA_RADIUS, RQA_THEILER_CORRECTOR, RQA_TILE_SIZE,
+                  iter_participants, load_participant, rqa_result_to_dict, run_jobs)
+
+GROUPED_RESULTS = 'GroupedResults.csv'
+FIELDNAMES = ['VP', 'analysis', 'grouping', 'group', 'measure', 'value']
+
+
+def groupings(tagged):
+    # group index and group names per grouping, for a list of (gaze mark, question, question mark)
+    questions, question_index = np.unique(np.array([x[1] for x in tagged], dtype=np.int64), return_inverse=True)
+    conditions, condition_index = np.unique(np.array([x[2][1] for x in tagged]), return_inverse=True)
+    return {'question': (question_index.reshape(-1), questions.tolist()),
+            'condition': (condition_index.reshape(-1), conditions.tolist())}
+
+
+def grouped_transitions(tagged, withFive=True):
+    # transition matrices of all groups from one bincount per grouping
+    codes = np.array([direction_code(x[0]) for x in tagged], dtype=np.int64)
+    for grouping, (index, names) in groupings(tagged).items():
+        matrices = relative_frequencies(count_grouped_transitions(codes, index, len(names)), withFive)
+        for name, matrix in zip(names, matrices):
+            yield grouping, name, matrix
+
+
+def run_recurrence(series, radius, tile_size=RQA_TILE_SIZE):
+    # recurrence of a run of consecutive points: by position index if only equal symbols recur, tile by tile
+    # otherwise, so memory stays bounded however long the run is
+    if rqa.radius_classes(series, [radius]) == [1]:
+        return rqa.CategoricalRecurrence(series, radius)
+    return rqa.TiledRecurrenceMatrix(series, radius, tile_size=tile_size)
+
+
+def grouped_rqa(points, radius=RQA_RADIUS, theiler_corrector=RQA_THEILER_CORRECTOR, tile_size=RQA_TILE_SIZE):
+    # RQA results of all groups. The points of a group come in contiguous runs (a question may be interrupted,
+    # a condition has several questions); every run is quantified on its own and the group gets the sum, so no
+    # lines run across the gaps between them
+    series = np.array([float(x[0]) for x in points])
+    for grouping, (index, names) in groupings(points).items():
+        for group, name in enumerate(names):
+            members = np.flatnonzero(index == group)
+            runs = np.split(members, np.flatnonzero(np.diff(members) > 1) + 1)
+            matrices = [run_recurrence(series[run], radius, tile_size) for run in runs]
+            yield grouping, name, rqa.RQAResult.from_blocks(matrices, theiler_corrector, **RQA_LINE_LENGTHS)
+
+
+def event_points(events, rows):
+    # (gaze mark, question, question mark) of the given rows of an event table
+    return list(zip(events['mark'][rows].tolist(), events['question'][rows].tolist(),
+                    events['question mark'][rows].tolist()))
+
+
+def breakdown_participant(vp_nr, br_path, ta_path, withFive=True, cache_path=CACHE_PATH):
+    # long format rows of the per-question and per-condition transitions and RQA of one participant
+    # every gaze interval within a question for the transitions, the recurrence points for the RQA
+    events = gaze_events(*load_participant(br_path, ta_path, cache_path))
+    tagged = event_points(events, np.flatnonzero(events['question'] >= 0))
+    if not tagged:
+        return []
+    points = event_points(events, np.flatnonzero(events['point'] >= 0))
+
+    rows = []
+    for grouping, group, matrix in grouped_transitions(tagged, withFive):
+        for source in range(NUMBER_OF_DIRECTIONS):
+            for target in range(NUMBER_OF_DIRECTIONS):
+                if not withFive and 5 in (source, target):
+                    continue
+                rows.append({'VP': vp_nr, 'analysis': 'transitions', 'grouping': grouping, 'group': group,
+                             'measure': '%d -> %d' % (source, target), 'value': float(matrix[source, target])})
+    for grouping, group, result in grouped_rqa(points):
+        rows += [{'VP': vp_nr, 'analysis': 'rqa', 'grouping': grouping, 'group': group, 'measure': measure,
+                  'value': value} for measure, value in rqa_result_to_dict(result).items()]
+    return rows
+
+
+def run_breakdown(output=os.path.join(ANALYSEN_PATH, GROUPED_RESULTS), withFive=True, workers=1,
+                  cache_path=CACHE_PATH):
+    jobs = [(vp_nr, br_path, ta_path, withFive, cache_path) for vp_nr, br_path, ta_path in iter_participants()]
+    with open(output, 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        for rows in run_jobs(breakdown_participant, jobs, workers):
+            writer.writerows(rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Transition matrices and RQA per ThinkAnswer question and per '
+                                                 'condition for all participants, as one long format table')
+    parser.add_argument('--output', default=os.path.join(ANALYSEN_PATH, GROUPED_RESULTS))
+    parser.add_argument('--without-five', action='store_true', help='leave transitions into direction 5 out')
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes')
+    parser.add_argument('--no-cache', action='store_true', help='always parse the TextGrid files')
+    args = parser.parse_args()
+
+    run_breakdown(args.output, not args.without_five, args.workers, None if args.no_cache else CACHE_PATH)
@@ -0,0 +1,117 @@
+import argparse
+import csv
+import itertools
+import os
+import re
+
+import numpy as np
+
+import rqa
+from main import (ANALYSEN_PATH, CACHE_PATH, RECURRENCE_PATH, RQA_LINE_LENGTHS, RQA_RADIUS,
+                  RQA_THEILER_CORRECTOR, RQA_TILE_SIZE, iter_participants, load_participant, recurrence_points,
+                  rqa_result_to_dict, run_jobs)
+
+CROSS_RESULTS = 'CrossRqaResults.csv'
+# members of a dyad share everything but the last digit of their VP number: vp11 and vp12, 2_vp21 and 2_vp22
+DYAD_REGEX = r'(\d*_*vp\d*)\d$'
+
+
+def dyads(vp_nrs):
+    # all pairs of participants of the same dyad, in VP order
+    members = dict()
+    for vp_nr in sorted(vp_nrs):
+        mo = re.match(DYAD_REGEX, vp_nr)
+        if mo:
+            members.setdefault(mo.group(1), []).append(vp_nr)
+    return [pair for dyad in sorted(members) for pair in itertools.combinations(members[dyad], 2)]
+
+
+def all_pairs(vp_nrs):
+    return list(itertools.combinations(sorted(vp_nrs), 2))
+
+
+def cross_recurrence(series, other_series, radius, tile_size=RQA_TILE_SIZE):
+    # cross recurrence of two series (columns: series, rows: other_series); equal symbols only need the
+    # position index, anything else is counted tile by tile
+    if rqa.radius_classes(np.concatenate([series, other_series]), [radius]) == [1]:
+        return rqa.CategoricalRecurrence(series, radius, other_series)
+    return rqa.TiledRecurrenceMatrix(series, radius, other_series, tile_size=tile_size)
+
+
+def joint_recurrence(series, other_series, radius, tile_size=RQA_TILE_SIZE):
+    # joint recurrence of two series; if only equal symbols recur, points i and j recur jointly exactly if
+    # the pairs (series[i], other_series[i]) and (series[j], other_series[j]) are equal, which is
+    # categorical auto recurrence of the pair codes
+    length = min(len(series), len(other_series))
+    series, other_series = series[:length], other_series[:length]
+    if (rqa.radius_classes(series, [radius]) == [1] and rqa.radius_classes(other_series, [radius]) == [1]):
+        _, pair_codes = np.unique(np.stack([series, other_series], axis=1), axis=0, return_inverse=True)
+        return rqa.CategoricalRecurrence(pair_codes.reshape(-1).astype(np.float64), 0.5)
+    return rqa.JointRecurrenceMatrix(series, other_series, radius, tile_size=tile_size)
+
+
+def analyse_pair(vp_x, vp_y, series_x, series_y, radius=RQA_RADIUS, theiler_corrector=0,
+                 joint_theiler_corrector=RQA_THEILER_CORRECTOR, tile_size=RQA_TILE_SIZE, plots=False):
+    # CRQA and JRQA result dicts of a pair of participants
+    rows = []
+    for analysis, matrix, corrector in (
+            ('crqa', cross_recurrence(series_x, series_y, radius, tile_size), theiler_corrector),
+            ('jrqa', joint_recurrence(series_x, series_y, radius, tile_size), joint_theiler_corrector)):
+        result = rqa.RQAResult.from_matrix(matrix, corrector, **RQA_LINE_LENGTHS)
+        rows.append(dict(rqa_result_to_dict(result), **{'VP x': vp_x, 'VP y': vp_y, 'analysis': analysis}))
+
+        if plots:
+            if analysis == 'crqa':
+                image = rqa.TiledRecurrenceMatrix(series_x, radius, series_y, tile_size=tile_size)
+            else:
+                image = rqa.JointRecurrenceMatrix(series_x, series_y, radius, tile_size=tile_size)
+            image.save_image(os.path.join(ANALYSEN_PATH, RECURRENCE_PATH,
+                                          '%s_%s_%s_recPlot.png' % (vp_x, vp_y, analysis)))
+    return rows
+
+
+def load_series(vp_nr, br_path, ta_path, cache_path=CACHE_PATH):
+    # the gaze series that the auto recurrence of a participant is computed from
+    points = recurrence_points(*load_participant(br_path, ta_path, cache_path))
+    return vp_nr, np.array([float(point[0]) for point in points])
+
+
+def run_cross(pairs='dyads', output=os.path.join(ANALYSEN_PATH, CROSS_RESULTS), workers=1, radius=RQA_RADIUS,
+              theiler_corrector=0, tile_size=RQA_TILE_SIZE, plots=False, cache_path=CACHE_PATH):
+    participants = list(iter_participants())
+
+    # the series are short next to their recurrence matrices, so they are extracted once and shipped to
+    # the workers; all pairs then only cost the matrices
+    series = dict(run_jobs(load_series, [participant + (cache_path,) for participant in participants], workers))
+    selected = dyads(series) if pairs == 'dyads' else all_pairs(series)
+    print("%d pairs of participants" % len(selected))
+    jobs = [(vp_x, vp_y, series[vp_x], series[vp_y], radius, theiler_corrector, RQA_THEILER_CORRECTOR,
+             tile_size, plots) for vp_x, vp_y in selected]
+
+    with open(output, 'w', newline='') as csvfile:
+        writer = None
+        for rows in run_jobs(analyse_pair, jobs, workers):
+            if writer is None:
+                writer = csv.DictWriter(csvfile, fieldnames=['VP x', 'VP y', 'analysis'] +
+                                        [key for key in rows[0] if key not in ('VP x', 'VP y', 'analysis')])
+                writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Cross and joint recurrence quantification of pairs of '
+                                                 'participants, written to one table')
+    parser.add_argument('--pairs', choices=('dyads', 'all'), default='dyads',
+                        help='the members of every dyad (vp11 and vp12, ...) or all pairs of participants')
+    parser.add_argument('--theiler', type=int, default=0, help='Theiler corrector of the cross recurrence '
+                                                               '(default: 0; the joint recurrence uses %d)'
+                                                               % RQA_THEILER_CORRECTOR)
+    parser.add_argument('--plots', action='store_true', help='also write cross and joint recurrence plots')
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes')
+    parser.add_argument('--tile-size', type=int, default=RQA_TILE_SIZE)
+    parser.add_argument('--output', default=os.path.join(ANALYSEN_PATH, CROSS_RESULTS))
+    parser.add_argument('--no-cache', action='store_true', help='always parse the TextGrid files')
+    args = parser.parse_args()
+
+    run_cross(args.pairs, args.output, args.workers, RQA_RADIUS, args.theiler, args.tile_size, args.plots,
+              None if args.no_cache else CACHE_PATH)
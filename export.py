@@ -0,0 +1,133 @@
+import os
+import zipfile
+
+import numpy as np
+
+from gaze import NUMBER_OF_DIRECTIONS, count_transitions, relative_frequencies
+
+
+def _pyarrow():
+    # pyarrow takes a while to import, so it is only loaded once an export starts; without it the tables are
+    # written as compressed NumPy archives, one array per column
+    try:
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def event_columns(vp_nr, events):
+    # the event table of gaze.gaze_events, with the participant
+    columns = dict({'VP': np.full(len(events['interval']), vp_nr)}, **events)
+    columns['direction'] = columns['direction'].astype(np.int8)
+    return columns
+
+
+def transition_columns(vp_nr, directions, withFive=True):
+    # the transition matrix in long form: counts and relative frequencies of every source and target direction
+    counts = count_transitions(directions)
+    source, target = np.divmod(np.arange(NUMBER_OF_DIRECTIONS ** 2, dtype=np.int8), NUMBER_OF_DIRECTIONS)
+    return {'VP': np.full(len(source), vp_nr), 'source': source, 'target': target,
+            'count': counts.reshape(-1).astype(np.int64),
+            'frequency': relative_frequencies(counts, withFive).reshape(-1)}
+
+
+def rqa_columns(vp_nr, result_dict):
+    return dict({'VP': np.array([vp_nr])},
+                **{measure: np.array([value], dtype=np.float64) for measure, value in result_dict.items()})
+
+
+def participant_tables(vp_nr, events, result_dict, withFive=True):
+    # the rows one participant adds to every table, all from its event table (no rqa row without a result)
+    tables = {'events': event_columns(vp_nr, events),
+              'transitions': transition_columns(vp_nr, events['direction'], withFive)}
+    if result_dict is not None:
+        tables['rqa'] = rqa_columns(vp_nr, result_dict)
+    return tables
+
+
+class _ColumnFiles:
+    """the columns of a table appended to one raw file each, joined into a .npz archive at the end
+
+    Only the dtype and length of every chunk stay in memory; close() streams the chunks into the
+    archive one at a time, converted to the dtype that holds all of them (e.g. the longest string).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.columns = dict()
+        os.makedirs(path + '.columns', exist_ok=True)
+
+    def _file(self, n):
+        return os.path.join(self.path + '.columns', '%d.bin' % n)
+
+    def append(self, columns):
+        for column, values in columns.items():
+            values = np.ascontiguousarray(values)
+            chunks = self.columns.setdefault(column, [])
+            with open(self._file(list(self.columns).index(column)), 'ab') as file:
+                file.write(values.tobytes())
+            chunks.append((values.dtype, len(values)))
+
+    def close(self):
+        with zipfile.ZipFile(self.path + '.part', 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+            for n, (column, chunks) in enumerate(self.columns.items()):
+                dtype = np.result_type(*[chunk_dtype for chunk_dtype, _ in chunks])
+                header = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False,
+                          'shape': (sum(length for _, length in chunks),)}
+                with archive.open(column + '.npy', 'w', force_zip64=True) as npy, open(self._file(n), 'rb') as file:
+                    np.lib.format.write_array_header_2_0(npy, header)
+                    for chunk_dtype, length in chunks:
+                        values = np.frombuffer(file.read(chunk_dtype.itemsize * length), dtype=chunk_dtype)
+                        npy.write(values.astype(dtype).tobytes())
+                os.remove(self._file(n))
+        os.rmdir(self.path + '.columns')
+        os.replace(self.path + '.part', self.path)
+
+
+class ColumnarExport:
+    """typed tables written column by column from the arrays of every participant
+
+    With pyarrow every table is a Parquet file that gets one row group per participant as they come
+    in; otherwise every participant's columns are appended to files on disk as they come in and
+    joined into a compressed .npz archive on close(). Either way memory does not grow with the
+    number of participants.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.pyarrow = _pyarrow()
+        self.writers = dict()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, table):
+        return os.path.join(self.directory, table + ('.parquet' if self.pyarrow is not None else '.npz'))
+
+    def add(self, tables):
+        for table, columns in tables.items():
+            if self.pyarrow is None:
+                if table not in self.writers:
+                    self.writers[table] = _ColumnFiles(self.path(table))
+                self.writers[table].append(columns)
+                continue
+            batch = self.pyarrow.table(columns)
+            if table not in self.writers:
+                self.writers[table] = self.pyarrow.parquet.ParquetWriter(self.path(table) + '.part', batch.schema)
+            self.writers[table].write_table(batch)
+
+    def close(self):
+        # the files only replace those of an earlier export once they are complete
+        for table, writer in self.writers.items():
+            writer.close()
+            if self.pyarrow is not None:
+                os.replace(self.path(table) + '.part', self.path(table))
+        self.writers = dict()
+
+
+def load_table(path):
+    # the columns of an exported table as a dict of NumPy arrays, from either format
+    if path.endswith('.npz'):
+        with np.load(path) as archive:
+            return {column: archive[column] for column in archive.files}
+    table = _pyarrow().parquet.read_table(path)
+    return {name: column.to_numpy() for name, column in zip(table.column_names, table.columns)}
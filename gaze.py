@@ -0,0 +1,179 @@
+import numpy as np
+
+from praatclasses import ArrayIntervalTier
+from tierjoin import interval_bounds, joined_marks, sweep_join
+
+# gaze directions are coded 0-9, see Colored_CodingGrid.png
+NUMBER_OF_DIRECTIONS = 10
+# code for marks that are not a gaze direction
+NO_DIRECTION = -1
+
+
+def direction_code(mark):
+    try:
+        direction = int(mark)
+    except ValueError:
+        return NO_DIRECTION
+    return direction if 0 <= direction < NUMBER_OF_DIRECTIONS else NO_DIRECTION
+
+
+def gaze_codes(interval_tier):
+    # one int per interval; array backed tiers only need each distinct mark converted once
+    if isinstance(interval_tier, ArrayIntervalTier):
+        lookup = np.array([direction_code(label) for label in interval_tier.labels()] + [NO_DIRECTION],
+                          dtype=np.int64)
+        return lookup[np.frombuffer(interval_tier.codes(), dtype=np.intc)]
+    return np.array([direction_code(interval.mark()) for interval in interval_tier], dtype=np.int64)
+
+
+def count_transitions(codes):
+    # 10x10 matrix of how often direction i was directly followed by a different direction j;
+    # intervals without a direction are skipped, so the gaze sequence continues across them
+    codes = codes[codes != NO_DIRECTION]
+    source, target = codes[:-1], codes[1:]
+    changes = source != target
+    counts = np.bincount(source[changes] * NUMBER_OF_DIRECTIONS + target[changes],
+                         minlength=NUMBER_OF_DIRECTIONS ** 2)
+    return counts.reshape(NUMBER_OF_DIRECTIONS, NUMBER_OF_DIRECTIONS)
+
+
+def count_grouped_transitions(codes, groups, number_of_groups):
+    # count_transitions for every group (e.g. question or condition) at once: (number_of_groups, 10, 10);
+    # only transitions between two intervals of the same group are counted
+    valid = codes != NO_DIRECTION
+    codes, groups = codes[valid], groups[valid]
+    source, target = codes[:-1], codes[1:]
+    changes = (source != target) & (groups[:-1] == groups[1:])
+    counts = np.bincount((groups[:-1][changes] * NUMBER_OF_DIRECTIONS + source[changes]) * NUMBER_OF_DIRECTIONS +
+                         target[changes], minlength=number_of_groups * NUMBER_OF_DIRECTIONS ** 2)
+    return counts.reshape(number_of_groups, NUMBER_OF_DIRECTIONS, NUMBER_OF_DIRECTIONS)
+
+
+def relative_frequencies(counts, withFive=True):
+    # normalise every row to sum 1, rounded to two digits like the published tables;
+    # without withFive, transitions into direction 5 are masked out before normalising.
+    # Works on stacks of matrices as well.
+    counts = np.asarray(counts, dtype=np.float64)
+    if not withFive:
+        counts = counts.copy()
+        counts[..., 5] = 0
+    sums = counts.sum(axis=-1, keepdims=True)
+    frequencies = np.divide(counts, sums, out=np.zeros_like(counts), where=sums > 0)
+    # Python's round() rounds the stored double correctly, np.round scales by 100 first and can land on the
+    # other side of .005 (1/40 is 0.03 in the tables, np.round makes it 0.02)
+    return np.array([round(value, 2) for value in frequencies.ravel().tolist()]).reshape(frequencies.shape)
+
+
+def transition_matrix(interval_tier, withFive=True):
+    return relative_frequencies(count_transitions(gaze_codes(interval_tier)), withFive)
+
+
+def repeat_mask(codes, groups=None):
+    # boolean mask of the gaze directions to keep when subsequently recurring ones are removed; needed because
+    # during the encoding process, two subsequent 5s were sometimes placed right next to each other. With groups
+    # (question numbers) a direction only counts as repeated if it stays the same within a question, or if the
+    # question changes right after it.
+    codes = np.asarray(codes)
+    n = len(codes)
+    repeated = np.zeros(n, dtype=bool)
+    repeated[1:] = codes[1:] == codes[:-1]
+    if groups is not None:
+        groups = np.asarray(groups)
+        same_group = np.zeros(n, dtype=bool)
+        same_group[1:] = groups[1:] == groups[:-1]
+        same_group[1:-1] |= groups[1:-1] == groups[2:]
+        repeated &= same_group
+    # within every run of repeats, only every other element is removed (the one after a removed
+    # element is kept), i.e. the ones at an even distance from the start of the run
+    index = np.arange(n)
+    run_start = np.maximum.accumulate(np.where(repeated, 0, index))
+    removed = repeated & ((index - run_start - 1) % 2 == 0)
+    return ~removed
+
+
+class ThinkAnswerIndex:
+    """sorted question boundaries of a ThinkAnswer tier
+
+    Every interval whose mark starts with "T" opens a question, which lasts until the end of
+    the following (answer) interval; questions are numbered n//2 by their position n in the
+    tier. Built once per tier, it assigns any number of gaze intervals with searchsorted.
+    """
+
+    def __init__(self, thinkanswer_tier):
+        if isinstance(thinkanswer_tier, ArrayIntervalTier):
+            marks = thinkanswer_tier.marks()
+            xmins = np.frombuffer(thinkanswer_tier.xmins(), dtype=np.float64)
+            xmaxs = np.frombuffer(thinkanswer_tier.xmaxs(), dtype=np.float64)
+        else:
+            marks = [interval.mark() for interval in thinkanswer_tier]
+            xmins = np.array([interval.xmin() for interval in thinkanswer_tier], dtype=np.float64)
+            xmaxs = np.array([interval.xmax() for interval in thinkanswer_tier], dtype=np.float64)
+
+        self.positions = np.array([n for n, mark in enumerate(marks) if mark[:1] == "T"], dtype=np.int64)
+        self.marks = [marks[n] for n in self.positions]
+        self.starts = xmins[self.positions]
+        self.ends = xmaxs[np.minimum(self.positions + 1, len(marks) - 1)]
+        self.questions = self.positions // 2
+        # binary search needs questions in time order, which is what Praat writes
+        self.ordered = bool(np.all(np.diff(self.starts) >= 0) and np.all(np.diff(self.ends) >= 0))
+
+    def _first_fit(self, start_values, times):
+        # index of the first question with start_values <= times <= end, or len(starts) if there is none
+        if not self.ordered:
+            fits = (start_values[None, :] <= times[:, None]) & (times[:, None] <= self.ends[None, :])
+            return np.where(fits.any(axis=1), fits.argmax(axis=1), len(self.starts))
+        slots = np.searchsorted(self.ends, times, side='left')
+        found = slots < len(self.starts)
+        found[found] = start_values[slots[found]] <= times[found]
+        return np.where(found, slots, len(self.starts))
+
+    def assign(self, times):
+        # question slot (index into positions/marks) for every time, -1 where no question fits
+        times = np.asarray(times, dtype=np.float64)
+        slots = self._first_fit(self.starts, times)
+
+        # times that fall outside every question get a second chance with the start times
+        # floored or rounded to whole seconds, whichever fits an earlier question
+        missing = slots == len(self.starts)
+        if missing.any():
+            rest = times[missing]
+            floored = self._first_fit(np.floor(self.starts), np.floor(rest))
+            rounded = self._first_fit(np.round(self.starts), np.round(rest))
+            slots[missing] = np.minimum(floored, rounded)
+        slots[slots == len(self.starts)] = -1
+        return slots
+
+def gaze_events(gaze_tier, thinkanswer_tier, tiers=None):
+    # the event table of a participant as a dict of columns, one row per gaze interval: its time, mark and
+    # direction, the question it falls into (-1 outside every question) with its mark and condition, and its
+    # index in the series of recurrence points (-1 outside every question or removed as a repeat).
+    # tiers ({column: interval tier}, e.g. the words) are joined in one sweep: the marks of their intervals
+    # overlapping every gaze interval, and the index of the first of them (-1 if there is none)
+    index = ThinkAnswerIndex(thinkanswer_tier)
+    xmins, xmaxs = interval_bounds(gaze_tier)
+    if isinstance(gaze_tier, ArrayIntervalTier):
+        labels = np.array(gaze_tier.labels(), dtype=np.str_)
+        mark_codes = np.frombuffer(gaze_tier.codes(), dtype=np.intc)
+    else:
+        labels, mark_codes = np.unique(np.array([interval.mark() for interval in gaze_tier], dtype=np.str_),
+                                       return_inverse=True)
+    slots = index.assign(xmins)
+    matched = np.flatnonzero(slots >= 0)
+
+    questions = np.full(len(xmins), -1, dtype=np.int32)
+    questions[matched] = index.questions[slots[matched]]
+    question_marks = np.array(index.marks + [''], dtype=np.str_)[slots]
+    conditions = np.array([mark[1:2] for mark in index.marks] + [''], dtype=np.str_)[slots]
+    # the repeats recurrence_points removes: same mark within the same question
+    points = np.full(len(xmins), -1, dtype=np.int32)
+    kept = matched[repeat_mask(mark_codes[matched], questions[matched])]
+    points[kept] = np.arange(len(kept))
+
+    events = {'interval': np.arange(len(xmins), dtype=np.int32), 'xmin': xmins.copy(), 'xmax': xmaxs.copy(),
+              'mark': labels[mark_codes], 'direction': gaze_codes(gaze_tier), 'question': questions,
+              'question mark': question_marks, 'condition': conditions, 'point': points}
+    names = list(tiers or ())
+    for name, (first, stop) in zip(names, sweep_join(gaze_tier, [tiers[name] for name in names])):
+        events[name] = np.array(joined_marks(tiers[name], first, stop), dtype=np.str_)
+        events[name + ' interval'] = np.where(stop > first, first, -1).astype(np.int32)
+    return events
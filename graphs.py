@@ -0,0 +1,60 @@
+import os
+import shutil
+import subprocess
+
+# drawn like the state diagrams of transitions' GraphMachine, which was used for these graphs before
+GRAPH_ATTRIBUTES = {'rankdir': 'LR'}
+NODE_ATTRIBUTES = {'shape': 'rectangle', 'style': 'rounded, filled', 'fillcolor': 'white', 'color': 'black'}
+EDGE_ATTRIBUTES = {'color': 'black'}
+# graphviz gets this many files per invocation, which keeps the command line short enough everywhere
+BATCH_SIZE = 200
+
+
+def _attributes(attributes):
+    return ', '.join('%s="%s"' % item for item in sorted(attributes.items()))
+
+
+def transition_dot(pattern_matrix, withFive=True, name='transitions'):
+    # DOT description of a transition matrix (ndarray, nested lists or dict of dicts): one state per gaze
+    # direction and one edge, labelled with the relative frequency, per transition that happens
+    directions = [x for x in range(len(pattern_matrix)) if withFive or x != 5]
+    lines = ['digraph "%s" {' % name,
+             '    graph [%s];' % _attributes(GRAPH_ATTRIBUTES),
+             '    node [%s];' % _attributes(NODE_ATTRIBUTES),
+             '    edge [%s];' % _attributes(EDGE_ATTRIBUTES)]
+    lines += ['    "%d";' % x for x in directions]
+    for blickrichtung in directions:
+        for next_blckrchtng in directions:
+            frequency = pattern_matrix[blickrichtung][next_blckrchtng]
+            if frequency == 0:
+                continue
+            lines.append('    "%d" -> "%d" [label="%s"];' % (blickrichtung, next_blckrchtng, float(frequency)))
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_transition_dot(filename, pattern_matrix, withFive=True):
+    with open(filename, mode='w') as file:
+        file.write(transition_dot(pattern_matrix, withFive, os.path.basename(filename)[:-4]))
+
+
+def render(dot_files, fmt='png'):
+    # renders foo.dot to foo.<fmt> for all files with as few graphviz calls as possible; returns the rendered
+    # files. Without graphviz (or with fmt 'dot') only the DOT files are left.
+    if fmt == 'dot' or not dot_files:
+        return []
+    dot = shutil.which('dot')
+    if dot is None:
+        print("graphviz' dot not found, only writing the DOT files of the transition graphs")
+        return []
+
+    rendered = []
+    for start in range(0, len(dot_files), BATCH_SIZE):
+        batch = dot_files[start:start + BATCH_SIZE]
+        # -O writes foo.dot.<fmt> next to every input
+        subprocess.run([dot, '-T' + fmt, '-O'] + batch, check=True)
+        for dot_file in batch:
+            target = dot_file[:-4] + '.' + fmt
+            os.replace(dot_file + '.' + fmt, target)
+            rendered.append(target)
+    return rendered
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+from array import array
+
+import numpy as np
+
+from praatclasses import TextGrid, PointTier, Point, ArrayIntervalTier, open_textgrid
+
+# bump this whenever the layout of the cached files changes
+CACHE_VERSION = 1
+
+
+class GridCache:
+    """on-disk cache of parsed TextGrids
+
+    Every parsed grid is stored as an uncompressed .npz file named after the sha1 of the
+    TextGrid's content. A small .ref file, named after the path, size and mtime of the
+    source, points at it, so a warm lookup only needs a stat() call. If the stat key is
+    unknown (new path, touched file) the content is hashed and an existing entry for the
+    same content is reused. Entries and .ref files are evicted least recently used first once
+    the cache holds more than max_bytes; .ref files whose entries are gone are dropped with
+    them. load(path, tiers) only parses and caches the given tiers; such entries are kept
+    apart from the ones of the whole grid.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 2 ** 20, precision=3):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.precision = precision
+        os.makedirs(directory, exist_ok=True)
+
+    def load(self, path, tiers=None):
+        # tiers: indices of the tiers to load (all by default); the grid returned holds just these, in this order
+        stat = os.stat(path)
+        stat_key = hashlib.sha1(('%s|%d|%d|%s|%d' % (os.path.abspath(path), stat.st_size, stat.st_mtime_ns,
+                                                     self.precision, CACHE_VERSION)).encode()).hexdigest()
+        ref = os.path.join(self.directory, stat_key + '.ref')
+
+        content_hash = None
+        if os.path.exists(ref):
+            with open(ref) as file:
+                content_hash = file.read().strip()
+        if content_hash is None or not os.path.exists(self._entry(content_hash, tiers)):
+            with open(path, 'rb') as file:
+                content_hash = hashlib.sha1(file.read()).hexdigest()
+            self._write_atomic(ref, content_hash.encode())
+
+        entry = self._entry(content_hash, tiers)
+        if os.path.exists(entry):
+            try:
+                grid = load_grid(entry)
+                # mark as recently used
+                os.utime(entry)
+                os.utime(ref)
+                return grid
+            except (OSError, ValueError, KeyError):
+                # damaged or half-evicted entry; fall through and re-parse
+                pass
+
+        # only the selected tiers get parsed
+        with open_textgrid(path, self.precision) as lazy:
+            grid = TextGrid()
+            for i in (range(len(lazy)) if tiers is None else tiers):
+                grid.append(lazy[i])
+            grid.change_times(lazy.xmin(), lazy.xmax())
+        self._write_atomic(entry, None, grid)
+        self.evict()
+        return grid
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.npz') or name.endswith('.ref'):
+                full = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(full)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, full))
+        total = sum(size for _, size, _ in entries)
+        kept = []
+        for mtime, size, full in sorted(entries):
+            if total <= self.max_bytes:
+                kept.append(full)
+                continue
+            try:
+                os.remove(full)
+            except OSError:
+                pass
+            total -= size
+
+        # a .ref is only worth keeping while some entry of its content is left (stale stat keys of touched or
+        # edited files age out above)
+        contents = set(os.path.basename(full).split('-')[0] for full in kept if full.endswith('.npz'))
+        for full in kept:
+            if full.endswith('.ref'):
+                try:
+                    with open(full) as file:
+                        orphaned = file.read().strip() not in contents
+                    if orphaned:
+                        os.remove(full)
+                except OSError:
+                    pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.npz') or name.endswith('.ref'):
+                os.remove(os.path.join(self.directory, name))
+
+    def _entry(self, content_hash, tiers=None):
+        selection = '' if tiers is None else '-t' + '_'.join(map(str, tiers))
+        return os.path.join(self.directory, '%s-%s%s.npz' % (content_hash, self.precision, selection))
+
+    def _write_atomic(self, destination, data, grid=None):
+        # write next to the destination and rename, so concurrent readers never see half a file
+        tmp = '%s.%d.tmp' % (destination, os.getpid())
+        with open(tmp, 'wb') as file:
+            if grid is None:
+                file.write(data)
+            else:
+                save_grid(file, grid)
+        os.replace(tmp, destination)
+
+
+def save_grid(file, grid):
+    # header and tier layout go into a JSON string, the columns into plain numeric arrays
+    tiers = []
+    arrays = dict()
+    for n, tier in enumerate(grid):
+        if isinstance(tier, ArrayIntervalTier):
+            tiers.append({'class': 'IntervalTier', 'name': tier.name(), 'xmin': tier.xmin(), 'xmax': tier.xmax()})
+            arrays['xmins%d' % n] = np.frombuffer(tier.xmins(), dtype=np.float64)
+            arrays['xmaxs%d' % n] = np.frombuffer(tier.xmaxs(), dtype=np.float64)
+            arrays['codes%d' % n] = np.frombuffer(tier.codes(), dtype=np.intc)
+            arrays['labels%d' % n] = np.array(tier.labels(), dtype=str)
+        else:
+            tiers.append({'class': 'TextTier', 'name': tier.name(), 'xmin': tier.xmin(), 'xmax': tier.xmax()})
+            arrays['times%d' % n] = np.array([point.time() for point in tier], dtype=np.float64)
+            arrays['labels%d' % n] = np.array([point.mark() for point in tier], dtype=str)
+    meta = {'version': CACHE_VERSION, 'xmin': grid.xmin(), 'xmax': grid.xmax(), 'tiers': tiers}
+    np.savez(file, meta=np.array(json.dumps(meta)), **arrays)
+
+
+def load_grid(filename):
+    with np.load(filename) as data:
+        meta = json.loads(str(data['meta']))
+        if meta['version'] != CACHE_VERSION:
+            raise ValueError('cache entry %s has an old layout' % filename)
+        grid = TextGrid()
+        for n, info in enumerate(meta['tiers']):
+            labels = data['labels%d' % n].tolist()
+            if info['class'] == 'IntervalTier':
+                tier = ArrayIntervalTier(info['name'], info['xmin'], info['xmax'],
+                                         _to_array('d', data['xmins%d' % n]),
+                                         _to_array('d', data['xmaxs%d' % n]),
+                                         _to_array('i', data['codes%d' % n]),
+                                         labels)
+            else:
+                tier = PointTier(info['name'], info['xmin'], info['xmax'])
+                for time, mark in zip(data['times%d' % n].tolist(), labels):
+                    tier.append(Point(time, mark))
+            grid.append(tier)
+        grid.change_times(meta['xmin'], meta['xmax'])
+    return grid
+
+
+def _to_array(typecode, ndarray):
+    column = array(typecode)
+    column.frombytes(np.ascontiguousarray(ndarray).tobytes())
+    return column
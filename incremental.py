@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+
+# bump this whenever the outputs of a participant change for the same inputs and settings
+MANIFEST_VERSION = 3
+
+
+def output_stat(path):
+    # [size, mtime] of an output file, None if it is missing
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class Manifest:
+    """what every participant's outputs were built from, for incremental re-analysis
+
+    For every participant and stage of the pipeline the manifest holds a fingerprint of what the
+    stage depends on (the content hashes of the TextGrids it reads plus the settings that change its
+    outputs) and the size and mtime of every output file it wrote, plus the participant's row of the
+    overall results. A stage is only run again if its fingerprint changed or an output is missing or
+    was rewritten since (e.g. by a run with other settings); runs of some of the stages leave the
+    entries of the others alone.
+    Content hashes are remembered together with size and mtime, so unchanged files are not read again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.participants = dict()
+        self.hashes = dict()
+        if os.path.exists(path):
+            try:
+                with open(path) as file:
+                    data = json.load(file)
+            except ValueError:
+                data = None
+            if data is not None and data.get('version') == MANIFEST_VERSION:
+                self.participants = data['participants']
+                self.hashes = data['hashes']
+
+    def file_hash(self, path):
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        known = self.hashes.get(key)
+        if known is not None and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+            return known['sha1']
+        with open(path, 'rb') as file:
+            sha1 = hashlib.sha1(file.read()).hexdigest()
+        self.hashes[key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha1': sha1}
+        return sha1
+
+    def fingerprint(self, inputs, settings):
+        # settings have to be JSON serialisable; they are normalised by a JSON round trip so that they
+        # compare equal to the stored ones (e.g. int dictionary keys become strings)
+        return json.loads(json.dumps({'inputs': [self.file_hash(path) for path in inputs], 'settings': settings},
+                                     sort_keys=True))
+
+    def is_current(self, vp_nr, stage, fingerprint):
+        entry = self.participants.get(vp_nr, {}).get('stages', {}).get(stage)
+        return (entry is not None and entry['fingerprint'] == fingerprint and
+                all(stat is not None and output_stat(output) == stat
+                    for output, stat in entry['outputs'].items()))
+
+    def row(self, vp_nr):
+        return self.participants[vp_nr]['row']
+
+    def record(self, vp_nr, stage, fingerprint, outputs, row=None):
+        # merged into the participant's entry; the row is only replaced by the stage that computes it
+        entry = self.participants.setdefault(vp_nr, {'stages': dict(), 'row': None})
+        entry['stages'][stage] = {'fingerprint': fingerprint,
+                                  'outputs': {output: output_stat(output) for output in outputs}}
+        if row is not None:
+            entry['row'] = row
+
+    def retain(self, vp_nrs):
+        # forget participants that are gone
+        vp_nrs = set(vp_nrs)
+        self.participants = {vp_nr: entry for vp_nr, entry in self.participants.items() if vp_nr in vp_nrs}
+
+    def save(self):
+        tmp = '%s.%d.tmp' % (self.path, os.getpid())
+        with open(tmp, 'w') as file:
+            json.dump({'version': MANIFEST_VERSION, 'participants': self.participants, 'hashes': self.hashes},
+                      file, indent=1)
+        os.replace(tmp, self.path)
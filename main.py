@@ -1,20 +1,22 @@
+import argparse
+import contextlib
 import csv
-import math
 import os
 import re
 import json
-from pyrqa.time_series import TimeSeries
-from pyrqa.settings import Settings
-from pyrqa.computing_type import ComputingType
-from pyrqa.neighbourhood import FixedRadius
-from pyrqa.metric import EuclideanMetric
-from pyrqa.computation import RQAComputation
-from pyrqa.computation import RPComputation
-from pyrqa.image_generator import ImageGenerator
-from collections import defaultdict
-from praatclasses import TextGrid
-from transitions.extensions import GraphMachine as Machine
-from PIL import Image, ImageDraw
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from praatclasses import ArrayIntervalTier, open_textgrid
+from gridcache import GridCache
+from incremental import Manifest
+from profiling import Profiler
+from gaze import count_transitions, gaze_events, relative_frequencies
+import rqa
+import render
+import graphs
+import export
+import recstore
 
 VP_WORDS_PATH = os.path.join('VPs', 'Words')
 VP_BLICKRICHTUNGEN_PATH = os.path.join('VPs', 'Blickrichtungen')
@@ -23,6 +25,34 @@ ANALYSEN_PATH = 'Analysen'
 CSV_PATH = 'csv'
 GRAPH_PATH = 'graphs'
 RECURRENCE_PATH = 'recPlots'
+# bit-packed recurrence matrices, see recstore.py
+MATRIX_PATH = 'recMatrices'
+# parsed TextGrids are cached here between runs; see gridcache.py
+CACHE_PATH = '.textgrid_cache'
+# --incremental keeps track of what every participant's outputs were built from in this file in ANALYSEN_PATH
+MANIFEST_NAME = '.manifest.json'
+# --profile writes its per-stage timings to this file in ANALYSEN_PATH
+PROFILE_REPORT = 'profile.json'
+# --export writes the event, transition and RQA tables to this directory in ANALYSEN_PATH, see export.py
+EXPORT_PATH = 'export'
+# stage() of a disabled profiler does nothing, so the pipeline is always instrumented
+DISABLED_PROFILER = Profiler()
+# recurrence quantification settings; gaze directions are categories, so any radius below 1 only lets
+# equal directions recur
+RQA_RADIUS = 0.65
+RQA_THEILER_CORRECTOR = 1
+RQA_MIN_LINE_LENGTH = 2
+# the minimum line lengths of every result, as keyword arguments of rqa.RQAResult and RQAResult.from_matrix
+RQA_LINE_LENGTHS = {'min_diagonal_line_length': RQA_MIN_LINE_LENGTH, 'min_vertical_line_length': RQA_MIN_LINE_LENGTH,
+                    'min_white_vertical_line_length': RQA_MIN_LINE_LENGTH}
+# the native backend works on tiles of this many rows and columns of the recurrence matrix at a time
+RQA_TILE_SIZE = 1024
+# 'pyrqa' runs pyrqa's Classic computation, 'native' the NumPy engine in rqa.py and 'categorical' the
+# symbol index of rqa.py, which only needs the recurrent points (only valid for radii below 1)
+RQA_BACKENDS = ('pyrqa', 'native', 'categorical')
+# the stages of the pipeline: transition tables, recurrence quantification (with the stored matrices),
+# recurrence plots and transition graphs; the command line runs all of them or a selection
+STAGES = ('transitions', 'rqa', 'plots', 'graphs')
 # change this dictionary if you want to change how the gaze directions are translated into colors; for current setup see
 # Colored_CodingGrid.png
 NUMBER2COLOR = {0: (102, 102, 102), 1: (0, 204, 255), 2: (0, 0, 255), 3: (0, 0, 128), 4: (196, 252, 176), 5: (0, 255, 0),
@@ -30,335 +60,496 @@ NUMBER2COLOR = {0: (102, 102, 102), 1: (0, 204, 255), 2: (0, 0, 255), 3: (0, 0,
 TA2COLOR = {0: (191,191,191), 1: (64, 64, 64)}
 CONDITION2COLOR = {"f": (255, 77, 255), "p" :(51, 204, 51), "s": (255, 153, 51)}
 
-def analyze_eye_movement_patterns(interval_tier):
-    pattern_dict = {}
-    for n in range(0, 10):
-        pattern_dict[n] = defaultdict((int))
+def format_frequency(value, happened):
+    # transitions that never happen are written as a plain 0 like in the original tables, rare ones whose
+    # frequency rounds to zero as 0.0
+    return str(float(value)) if happened else '0'
 
-    current_direction = None
 
-    for interval in interval_tier:
-
-        if current_direction is None:
-            try:
-                current_direction = int(interval.mark())
-            except ValueError:
-                del interval
-                continue
-        else:
-            try:
-                next_direction = int(interval.mark())
-                if next_direction != current_direction:
-                    pattern_dict[current_direction][next_direction] += 1
-
-                current_direction = next_direction
-
-            except ValueError:
-                del interval
-                continue
-
-    return pattern_dict
-
-
-def compute_relative_frequencies(pattern_dict, withFive=True):
-    for blickrichtung in pattern_dict:
-        sum = 0
-        for key, v in pattern_dict[blickrichtung].items():
-            if not withFive and key == 5:
-                continue
-            sum += v
-
-        for key in pattern_dict[blickrichtung]:
-            if not withFive and key == 5:
-                continue
-            value = pattern_dict[blickrichtung][key]
-            pattern_dict[blickrichtung][key] = round(value / sum, 2)
-
-    return pattern_dict
-
-
-def write_movementpattern_to_csv(filename, pattern_dict, withFive=True):
+def write_movementpattern_to_csv(filename, pattern_matrix, counts, withFive=True):
+    # pattern_matrix: 10x10 array of relative transition frequencies, see gaze.transition_matrix;
+    # counts: the transition counts they were computed from, see gaze.count_transitions
+    happened = np.asarray(counts) > 0
+    if not withFive:
+        happened[:, 5] = False
     with open(filename, mode='w', newline='') as csvfile:
         writer = csv.writer(csvfile)
         writer.writerow([None] + [str(x) for x in range(0, 10)])
-        for blickrichtung in pattern_dict:
+        for blickrichtung in range(len(pattern_matrix)):
 
             if not withFive and blickrichtung == 5:
                 continue
-            row = [str(pattern_dict[blickrichtung][x]) for x in range(0, 10)]
+            row = [format_frequency(pattern_matrix[blickrichtung][x], happened[blickrichtung][x]) for x in range(0, 10)]
             writer.writerow([str(blickrichtung)] + row)
 
 
-def create_transition_graph_from_dict(pattern_dict, withFive=True):
-    if withFive:
-        machine = Machine(states=[str(x) for x in pattern_dict.keys()], use_pygraphviz=False)
-
-    else:
-        machine = Machine(states=[str(x) for x in pattern_dict.keys() if x != 5], use_pygraphviz=False)
-
-    for blickrichtung in pattern_dict:
-        for next_blckrchtng in pattern_dict[blickrichtung]:
-
-            if not withFive and (blickrichtung == 5 or next_blckrchtng == 5):
-                continue
-            if pattern_dict[blickrichtung][next_blckrchtng] == 0:
-                continue
-
-            machine.add_transition(str(pattern_dict[blickrichtung][next_blckrchtng]), str(blickrichtung),
-                                   str(next_blckrchtng))
-
-    return machine
-
-
-def create_recurrence_plot_from_intervaltier(blickrichtung_tier, thinkanswer_tier, destination, withFive=True):
-
-    def create_list_from_thinkanswer_tier(blickrichtung_tier, thinkanswer_tier):
-
-        thinkanswer_list = []
-
-        for blkrchtng in blickrichtung_tier:
-            for n in range(len(thinkanswer_tier)):
-                mark = thinkanswer_tier[n].mark()
-                if mark[0] == "T":
-                    question_xmin = thinkanswer_tier[n].xmin()
-                    question_xmax = thinkanswer_tier[n+1].xmax()
-                    if question_xmin <= blkrchtng.xmin() <= question_xmax:
-                        thinkanswer_list.append((blkrchtng.mark(), n//2, mark))
-                        break
-            else:
-                for n in range(len(thinkanswer_tier)):
-                    mark = thinkanswer_tier[n].mark()
-                    if mark[0] == "T":
-                        question_xmin = thinkanswer_tier[n].xmin()
-                        question_xmax = thinkanswer_tier[n + 1].xmax()
-                        if   math.floor(question_xmin) <= math.floor(blkrchtng.xmin()) <= question_xmax:
-                            thinkanswer_list.append((blkrchtng.mark(), n // 2, mark))
-                            break
-                        elif  round(question_xmin) <= round(blkrchtng.xmin()) <= question_xmax:
-                            thinkanswer_list.append((blkrchtng.mark(), n // 2, mark))
-                            break
-                else:
-                    print("No fit:" + str(blkrchtng))
-
-        return thinkanswer_list
-
-    thinkanswer_list = create_list_from_thinkanswer_tier(blickrichtung_tier, thinkanswer_tier)
-    print("len :" + str(count_TAs(thinkanswer_list)))
-    # turn interval tier into list of marks
-
-    print("len: " + str(count_TAs(thinkanswer_list)))
-    thinkanswer_list_clean = remove_doubles_from_list(thinkanswer_list, lambda x: x[:2])
-    print("len: " + str(count_TAs(thinkanswer_list)))
-
+def recurrence_points(blickrichtung_tier, thinkanswer_tier, events=None):
+    # the points of the recurrence analysis: (gaze mark, question number, question mark) for every gaze interval
+    # within a question, with repeated directions removed; taken from the event table (see gaze.gaze_events),
+    # which is built here unless it is given
+
+    # every gaze interval is tagged with the question (and its condition) it belongs to
+    if events is None:
+        events = gaze_events(blickrichtung_tier, thinkanswer_tier)
+    unmatched = np.flatnonzero(events['question'] < 0)
+    if len(unmatched):
+        print("No fit for %d of %d gaze intervals: %s" % (len(unmatched), len(blickrichtung_tier),
+                                                          ", ".join(str(blickrichtung_tier[i]) for i in unmatched)))
+    questions = str(len(np.unique(events['question'][events['question'] >= 0])))
+    print("len :" + questions)
+    print("len: " + questions)
+    kept = np.flatnonzero(events['point'] >= 0)
+    thinkanswer_list_clean = list(zip(events['mark'][kept].tolist(), events['question'][kept].tolist(),
+                                      events['question mark'][kept].tolist()))
+    print("len: " + questions)
+    return thinkanswer_list_clean
+
+
+def create_recurrence_plot_from_intervaltier(blickrichtung_tier, thinkanswer_tier, destination, withFive=True,
+                                             backend='pyrqa', tile_size=RQA_TILE_SIZE, plain_plot=True,
+                                             profiler=DISABLED_PROFILER, vp_nr=None, matrix_destination=None,
+                                             quantify=True, plots=True, events=None):
+    # quantify: RQA result and _recAnal.txt (returns None without), plots: the recurrence plots; events: the
+    # event table of the participant if it is already built
+
+    with profiler.stage('recurrence points', vp_nr):
+        thinkanswer_list_clean = recurrence_points(blickrichtung_tier, thinkanswer_tier, events)
     data_points = [x[0] for x in thinkanswer_list_clean]
 
-
-    time_series = TimeSeries(data_points, embedding_dimension=1, time_delay=0)
-    settings = Settings(time_series,
-                        computing_type=ComputingType.Classic,
-                        neighbourhood=FixedRadius(0.65),
-                        similarity_measure=EuclideanMetric,
-                        theiler_corrector=1)
-
-    computation = RQAComputation.create(settings,
-                                        verbose=True)
-    result = computation.run()
-    result.min_diagonal_line_length = 2
-    result.min_vertical_line_length = 2
-    result.min_white_vertical_line_lelngth = 2
-    with open(destination + "_recAnal.txt", mode='w') as file:
-        file.write(str(result))
-
-    computation = RPComputation.create(settings)
-    rp_result = computation.run()
-    ImageGenerator.save_recurrence_plot(rp_result.recurrence_matrix_reverse,
-                                        destination + "_recPlot.png")
-
-
-    add_numbers_to_recurrence_plot(thinkanswer_list_clean, destination + "_recPlot.png")
-
-    return result
-
-def remove_doubles_from_list(data_points, func= lambda x: x):
-
-    # this elaborate code is designed to remove all subsequently recurring numbers in the gaze directions.
-    # needed because during the encoding process, two subsequent 5s were sometimes placed right next to each other
-    dic = dict()
-    to_remove = []
-    # enumerate all data points
-    for n in range(len(data_points)):
-        dic[n] = data_points[n]
-    for key in dic:
-        # can't remove the first one, so skip
-        if key == 0 or key-1 in to_remove:
-            continue
-
-        # if the two values next to each other are the same, add one of them to the 2remove list
-        prev = func(dic[key-1])
-        this = func(dic[key])
-        try:
-            nex = func(dic[key+1])
-        except KeyError:
-            nex = "False"
-        if len(prev) > 1:
-            if prev[0] == this[0]:
-                if prev[1] == this[1] or this[1] == nex[1]:
-                    to_remove.append(key)
-        elif prev == this:
-            to_remove.append(key)
-    # remove all previously identified values
-    for n in to_remove:
-        del dic[n]
-    return list(dic.values())
-
-
-def cleanup_IntervalTier(intervals):
-
-    # change interval marks to literals where applicable
-    for interval in intervals:
-        if len(interval.mark()) > 1:
-            interval.change_text(interval.mark()[0])
-
-
-def add_numbers_to_recurrence_plot(numbers, recPlot, withQuestions=True):
-
-    # open recurrence plot
-    plotIm = Image.open(recPlot)
-
-    if not withQuestions:
-        horiOffset = 1
+    result = None
+    if backend in ('native', 'categorical'):
+        # the recurrence matrix is computed tile by tile for the measures and again for the images, so
+        # apart from the final image memory stays bounded for arbitrarily long recordings
+        series = [float(x) for x in data_points]
+        recurrence_matrix = rqa.TiledRecurrenceMatrix(series, RQA_RADIUS, tile_size=tile_size)
+        if quantify:
+            with profiler.stage('rqa', vp_nr):
+                if backend == 'categorical':
+                    result = rqa.RQAResult.from_matrix(rqa.CategoricalRecurrence(series, RQA_RADIUS),
+                                                       RQA_THEILER_CORRECTOR, **RQA_LINE_LENGTHS)
+                else:
+                    result = rqa.RQAResult.from_matrix(recurrence_matrix, RQA_THEILER_CORRECTOR, **RQA_LINE_LENGTHS)
+        if plots and plain_plot:
+            with profiler.stage('plain plot', vp_nr):
+                recurrence_matrix.save_image(destination + "_recPlot.png")
     else:
-        horiOffset = 3
-    # create new image, but 1px or 2px wider and 1px higher, depending on withQuestions, with backgroundcolor white
-    newPlotIm = Image.new(plotIm.mode, (plotIm.width + horiOffset, plotIm.height + 1), color='white')
-    # paste the opened recPlot into the new image at location (1,0) so that there remains a white strip to the left and
-    # at the bottom of the new image
-    newPlotIm.paste(plotIm, box=(horiOffset, 0))
-
-    # create a dictionary to store the colors representing the numbers in; for reference see Colored_CodingGrid.png
-    number_color_dict = dict()
+        # pyrqa brings its OpenCL tooling along, so it is only imported once its backend actually runs
+        from pyrqa.time_series import TimeSeries
+        from pyrqa.settings import Settings
+        from pyrqa.computing_type import ComputingType
+        from pyrqa.neighbourhood import FixedRadius
+        from pyrqa.metric import EuclideanMetric
+        from pyrqa.computation import RQAComputation
+        from pyrqa.computation import RPComputation
+        from pyrqa.image_generator import ImageGenerator
+
+        time_series = TimeSeries(data_points, embedding_dimension=1, time_delay=0)
+        settings = Settings(time_series,
+                            computing_type=ComputingType.Classic,
+                            neighbourhood=FixedRadius(RQA_RADIUS),
+                            similarity_measure=EuclideanMetric,
+                            theiler_corrector=RQA_THEILER_CORRECTOR)
+
+        if quantify:
+            with profiler.stage('rqa', vp_nr):
+                computation = RQAComputation.create(settings,
+                                                    verbose=True)
+                result = computation.run()
+                result.min_diagonal_line_length = RQA_MIN_LINE_LENGTH
+                result.min_vertical_line_length = RQA_MIN_LINE_LENGTH
+                result.min_white_vertical_line_length = RQA_MIN_LINE_LENGTH
+
+        recurrence_matrix = None
+        if plots or matrix_destination is not None:
+            with profiler.stage('recurrence matrix', vp_nr):
+                computation = RPComputation.create(settings)
+                recurrence_matrix_reverse = computation.run().recurrence_matrix_reverse
+            if plots and plain_plot:
+                with profiler.stage('plain plot', vp_nr):
+                    ImageGenerator.save_recurrence_plot(recurrence_matrix_reverse, destination + "_recPlot.png")
+            recurrence_matrix = recurrence_matrix_reverse[::-1] != 0
+
+    # the matrix itself, for later inspection without recomputing it
+    if matrix_destination is not None:
+        with profiler.stage('store matrix', vp_nr):
+            recstore.write_matrix(matrix_destination, recurrence_matrix, radius=RQA_RADIUS,
+                                  theiler_corrector=RQA_THEILER_CORRECTOR, min_line_length=RQA_MIN_LINE_LENGTH,
+                                  backend=backend)
+
+    if result is not None:
+        with open(destination + "_recAnal.txt", mode='w') as file:
+            file.write(str(result))
+
+    # the numbered plot is drawn straight from the matrix, see render.py
+    if plots:
+        with profiler.stage('numbered plot', vp_nr):
+            render.save_image(render.numbered_recurrence_plot(recurrence_matrix, thinkanswer_list_clean,
+                                                              NUMBER2COLOR, TA2COLOR, CONDITION2COLOR),
+                              destination + "_recPlot_numbered.png")
 
-    # fill in the colors corresponding to the numbers as specified in NUMBER2COLOR
-    for number in NUMBER2COLOR:
-        number_color_dict[NUMBER2COLOR[number]] = []
-
-    if withQuestions:
-
-        question_color_dict = dict()
-        conditions_color_dict = dict()
-        for ta in TA2COLOR:
-            question_color_dict[TA2COLOR[ta]] = []
-        for condition in CONDITION2COLOR:
-            conditions_color_dict[CONDITION2COLOR[condition]] = []
-    # fill in the dictionary with points at which to draw a particular color
-    for number in range(len(numbers)):
-        number_color_dict[NUMBER2COLOR[int(numbers[number][0])]] += [(horiOffset-1, (newPlotIm.height-2) - (number)), (number+horiOffset, newPlotIm.height-1)]
-
-        if withQuestions:
-            question_color_dict[TA2COLOR[numbers[number][1]%2]] += [(horiOffset -2, (newPlotIm.height-2) - number)]
-            conditions_color_dict[CONDITION2COLOR[numbers[number][2][1]]] += [(horiOffset - 3, (newPlotIm.height-2) - number)]
-
-    plotDraw = ImageDraw.Draw(newPlotIm)
-
-    for color in number_color_dict:
-         plotDraw.point(number_color_dict[color], color)
-
-    for color in question_color_dict:
-        plotDraw.point(question_color_dict[color], color)
-
-    for color in conditions_color_dict:
-        plotDraw.point(conditions_color_dict[color], color)
-
-    newPlotIm.save(recPlot[:-4] + "_numbered.png")
+    return result
 
-def do_Analysis(withFive=True):
+def find_grids(directory):
+    # {vp_nr: path} of the TextGrids in directory
     regex = r'(\d*_*vp\d*)_.*\.TextGrid'
-
-    # this reads in the Blickrichtungen (gaze directions) tiers from all participants
-    VP_brGrids = dict()
-
-    for filename in os.listdir(VP_BLICKRICHTUNGEN_PATH):
+    grids = dict()
+    for filename in os.listdir(directory):
         mo = re.search(regex, filename)
         if mo:
-            vp_nr = mo.group(1)
-            VP_brGrids[vp_nr] = TextGrid()
-            VP_brGrids[vp_nr].read(os.path.join(VP_BLICKRICHTUNGEN_PATH, filename))
-            VP_brGrids[vp_nr][0].delete_empty()
-            cleanup_IntervalTier(VP_brGrids[vp_nr][0])
-
-    # this reads in the ThinkAnswer tiers from all participants; needed for the recurrence plots
-    VP_taGrids = dict()
-    for filename in os.listdir(VP_THINKANSWER_PATH):
-        mo = re.search(regex, filename)
-        if mo:
-            vp_nr = mo.group(1)
-            VP_taGrids[vp_nr] = TextGrid()
-            VP_taGrids[vp_nr].read(os.path.join(VP_THINKANSWER_PATH, filename))
-            VP_taGrids[vp_nr][0].delete_empty()
-
-    VP_PatternDicts = dict()
+            grids[mo.group(1)] = os.path.join(directory, filename)
+    return grids
 
-    for vp_nr in VP_brGrids:
-        VP_PatternDicts[vp_nr] = analyze_eye_movement_patterns(VP_brGrids[vp_nr][0])
 
-        compute_relative_frequencies(VP_PatternDicts[vp_nr], withFive)
-
-    # create the transition matrix for the gaze directions of each participant
-    for vp_nr in VP_PatternDicts:
-        # also save the transition matrix as a csv file just because
-        write_movementpattern_to_csv(os.path.join(ANALYSEN_PATH, CSV_PATH, vp_nr + "_tabelle.csv"),
-                                     VP_PatternDicts[vp_nr])
-
-        machine = create_transition_graph_from_dict(VP_PatternDicts[vp_nr], withFive)
-        machine.get_combined_graph().draw(os.path.join(ANALYSEN_PATH, GRAPH_PATH, vp_nr + "_graph.png"))
-
-    # create the recurrence plots for each participant and save the rqa results in a list for later
-    rqa_results = []
-    for vp_nr in VP_brGrids:
-         result = create_recurrence_plot_from_intervaltier(VP_brGrids[vp_nr][0], VP_taGrids[vp_nr][0], os.path.join(ANALYSEN_PATH, RECURRENCE_PATH,
-                                                                                      vp_nr), withFive)
-         rqa_results.append((vp_nr,result))
+def iter_participants():
+    # (vp_nr, Blickrichtungen grid, ThinkAnswer grid) of every participant, in VP order so that runs are
+    # reproducible; only file names are listed up front, the grids are left to analyse_participant
+    ta_files = find_grids(VP_THINKANSWER_PATH)
+    br_files = find_grids(VP_BLICKRICHTUNGEN_PATH)
 
+    for vp_nr in sorted(br_files):
+        if vp_nr not in ta_files:
+            print("No ThinkAnswer grid for " + vp_nr + ", skipping")
+            continue
+        yield vp_nr, br_files[vp_nr], ta_files[vp_nr]
+
+
+def tier_loader(cache_path=CACHE_PATH):
+    # only the first tier of each grid is used, so the others are never parsed; warm runs load it from the cache
+    # instead of parsing the text files again
+    if cache_path:
+        cache = GridCache(cache_path)
+        return lambda path: cache.load(path, tiers=(0,))[0]
+    return lambda path: open_textgrid(path)[0]
+
+
+def report_overlaps(overlaps):
+    for first, second, name in overlaps:
+        print("Overlapping intervals %s and %s on tier %s" % (first, second, name))
+
+
+def load_participant(br_path, ta_path, cache_path=CACHE_PATH):
+    # Blickrichtungen (gaze directions) tier and ThinkAnswer tier; the latter is needed for the recurrence plots
+    load_tier = tier_loader(cache_path)
+
+    # one compacting pass per tier drops the empty intervals and cuts gaze marks like "1  " to their first character
+    br_tier = load_tier(br_path)
+    overlaps = br_tier.clean(truncate=1)
+    ta_tier = load_tier(ta_path)
+    overlaps += ta_tier.clean()
+    report_overlaps(overlaps)
+    return br_tier, ta_tier
+
+
+def load_words(words_path, cache_path=CACHE_PATH):
+    # Words tier (the words spoken, pauses are empty and dropped); participants without a words grid get an empty
+    # tier, so that the event tables of all participants have the same columns
+    if words_path is None:
+        return ArrayIntervalTier('Words')
+    words_tier = tier_loader(cache_path)(words_path)
+    report_overlaps(words_tier.clean())
+    return words_tier
+
+
+def analyse_participant(vp_nr, br_path, ta_path, withFive=True, cache_path=CACHE_PATH, backend='pyrqa',
+                        tile_size=RQA_TILE_SIZE, plain_plot=True, profiling=None, export_tables=False,
+                        store_matrix=True, stages=STAGES, words_path=None):
+    # the whole pipeline for one participant; runs in a worker process when do_Analysis gets workers > 1.
+    # profiling: Profiler.settings() of the parent, whose stage records are returned along with the result;
+    # with export_tables the participant's columns for export.ColumnarExport are returned as well, with the words
+    # of words_path joined to the gaze events. Only the given stages run; the result dict is None without 'rqa'.
+
+    profiler = Profiler(*profiling) if profiling is not None else DISABLED_PROFILER
+    with profiler.participant(vp_nr):
+        with profiler.stage('read', vp_nr):
+            br_tier, ta_tier = load_participant(br_path, ta_path, cache_path)
+            words_tier = load_words(words_path, cache_path) if export_tables else None
+
+        # one table of all gaze intervals with their question, condition (and words) feeds every stage
+        with profiler.stage('events', vp_nr):
+            events = gaze_events(br_tier, ta_tier, {'words': words_tier} if export_tables else None)
+
+        # create the transition matrix for the gaze directions
+        if 'transitions' in stages or 'graphs' in stages:
+            with profiler.stage('transitions', vp_nr):
+                counts = count_transitions(events['direction'])
+                pattern_matrix = relative_frequencies(counts, withFive)
+
+                # also save the transition matrix as a csv file just because
+                if 'transitions' in stages:
+                    write_movementpattern_to_csv(os.path.join(ANALYSEN_PATH, CSV_PATH, vp_nr + "_tabelle.csv"),
+                                                 pattern_matrix, counts)
+
+                # DOT description of the transition graph; do_Analysis renders all of them in one go
+                if 'graphs' in stages:
+                    graphs.write_transition_dot(os.path.join(ANALYSEN_PATH, GRAPH_PATH, vp_nr + "_graph.dot"),
+                                                pattern_matrix, withFive)
+
+        # create the recurrence plot; only the metrics travel back to the parent process
+        result_dict = None
+        if 'rqa' in stages or 'plots' in stages:
+            result = create_recurrence_plot_from_intervaltier(
+                br_tier, ta_tier, os.path.join(ANALYSEN_PATH, RECURRENCE_PATH, vp_nr), withFive, backend, tile_size,
+                plain_plot, profiler, vp_nr, matrix_path(vp_nr) if store_matrix and 'rqa' in stages else None,
+                quantify='rqa' in stages, plots='plots' in stages, events=events)
+            if result is not None:
+                result_dict = rqa_result_to_dict(result)
+
+        tables = None
+        if export_tables:
+            with profiler.stage('export', vp_nr):
+                tables = export.participant_tables(vp_nr, events, result_dict, withFive)
+    return vp_nr, result_dict, profiler.take_records(), tables
+
+
+def matrix_path(vp_nr):
+    # where the recurrence matrix of a participant is stored, without the recstore suffixes
+    return os.path.join(ANALYSEN_PATH, MATRIX_PATH, vp_nr + "_recMatrix")
+
+
+def participant_outputs(vp_nr, plain_plot=True, store_matrix=True, stages=STAGES):
+    # the files analyse_participant writes
+    recurrence = os.path.join(ANALYSEN_PATH, RECURRENCE_PATH, vp_nr)
+    outputs = []
+    if 'transitions' in stages:
+        outputs.append(os.path.join(ANALYSEN_PATH, CSV_PATH, vp_nr + "_tabelle.csv"))
+    if 'graphs' in stages:
+        outputs.append(os.path.join(ANALYSEN_PATH, GRAPH_PATH, vp_nr + "_graph.dot"))
+    if 'rqa' in stages:
+        outputs.append(recurrence + "_recAnal.txt")
+        if store_matrix:
+            outputs += [matrix_path(vp_nr) + recstore.BITS_SUFFIX, matrix_path(vp_nr) + recstore.HEADER_SUFFIX]
+    if 'plots' in stages:
+        outputs.append(recurrence + "_recPlot_numbered.png")
+        if plain_plot:
+            outputs.append(recurrence + "_recPlot.png")
+    return outputs
+
+
+def stage_dependencies(stage, br_path, ta_path, withFive=True, backend='pyrqa', plain_plot=True, store_matrix=True):
+    # (TextGrids, settings) that change what a stage of analyse_participant writes; the transition tables and
+    # graphs only depend on the gaze directions, and only the plots on the colors
+    if stage in ('transitions', 'graphs'):
+        return [br_path], {'withFive': withFive}
+    settings = {'backend': backend, 'rqa': {'radius': RQA_RADIUS, 'theiler_corrector': RQA_THEILER_CORRECTOR,
+                                            'min_line_length': RQA_MIN_LINE_LENGTH}}
+    if stage == 'rqa':
+        settings['store_matrix'] = store_matrix
+    else:
+        settings['plain_plot'] = plain_plot
+        settings['colors'] = {'numbers': NUMBER2COLOR, 'questions': TA2COLOR, 'conditions': CONDITION2COLOR}
+    return [br_path, ta_path], settings
+
+
+def run_in_order(items, workers=1):
+    # items: (vp_nr, result_dict, [], None) of participants that are done or argument tuples for
+    # analyse_participant; yields (vp_nr, result_dict, profiling records, export tables, analysed) in the order
+    # of items. With a process pool, at most 2 * workers participants are in flight, so finished results never
+    # pile up.
+    if workers <= 1:
+        for done, item in items:
+            yield analyse_participant(*item) + (True,) if not done else item + (False,)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for done, item in items:
+            pending.append((done, item if done else executor.submit(analyse_participant, *item)))
+            while len(pending) >= 2 * workers:
+                done, item = pending.popleft()
+                yield item + (False,) if done else item.result() + (True,)
+        while pending:
+            done, item = pending.popleft()
+            yield item + (False,) if done else item.result() + (True,)
+
+
+def run_jobs(function, jobs, workers=1):
+    # function(*job) for every job, in the order of jobs; in a process pool if workers > 1 and there is more than
+    # one job. Used by the command line tools that analyse every participant (or pair) on their own.
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            yield from executor.map(function, *zip(*jobs))
+    else:
+        for job in jobs:
+            yield function(*job)
+
+
+def do_Analysis(withFive=True, cache_path=CACHE_PATH, workers=1, backend='pyrqa', tile_size=RQA_TILE_SIZE,
+                plain_plot=True, graph_format='png', incremental=False, profiler=DISABLED_PROFILER,
+                profile_report=None, export_tables=False, store_matrix=True, stages=STAGES):
+    # participants are streamed through the pipeline one by one and their rows appended to the overall
+    # table as they finish, so memory does not grow with the number of participants. Stages that are not
+    # selected leave their outputs alone.
+
+    # in incremental mode the stages of a participant whose inputs, settings and outputs are unchanged keep their
+    # results; only the outdated stages run
+    manifest = Manifest(os.path.join(ANALYSEN_PATH, MANIFEST_NAME)) if incremental else None
+    fingerprints = dict()
+    outdated = dict()
+    counts = {'up to date': 0, 'analysed': 0}
+    paths = dict()
+    # the words spoken are only joined to the exported gaze events
+    words_files = find_grids(VP_WORDS_PATH) if export_tables and os.path.isdir(VP_WORDS_PATH) else dict()
+
+    def items():
+        for vp_nr, br_path, ta_path in iter_participants():
+            paths[vp_nr] = br_path, ta_path
+            outdated[vp_nr] = stages
+            if manifest is not None:
+                fingerprints[vp_nr] = {stage: manifest.fingerprint(*stage_dependencies(
+                    stage, br_path, ta_path, withFive, backend, plain_plot, store_matrix)) for stage in stages}
+                outdated[vp_nr] = tuple(stage for stage in stages
+                                        if not manifest.is_current(vp_nr, stage, fingerprints[vp_nr][stage]))
+                if not outdated[vp_nr]:
+                    yield True, (vp_nr, None, [], None)
+                    continue
+            yield False, (vp_nr, br_path, ta_path, withFive, cache_path, backend, tile_size, plain_plot,
+                          profiler.settings() if profiler.enabled else None, export_tables, store_matrix,
+                          outdated[vp_nr], words_files.get(vp_nr))
+
+    # typed tables straight from the arrays of every participant, next to the csv files
+    exporter = export.ColumnarExport(os.path.join(ANALYSEN_PATH, EXPORT_PATH)) if export_tables else None
+
+    dot_files = []
     # write results into a nice csv-table
-    with open(os.path.join(ANALYSEN_PATH, "OverallRqaResults.csv"), 'w') as csvfile:
-        fieldnames = None
+    with (open(os.path.join(ANALYSEN_PATH, "OverallRqaResults.csv"), 'w') if 'rqa' in stages else
+          contextlib.nullcontext()) as csvfile:
         writer = None
-        for vp_nr, result in rqa_results:
-            print(to_json(result))
-            result_dict = json.loads(to_json(result))
-            if fieldnames == None:
-                fieldnames = ['VP'] + list(result_dict.keys())
-            if writer == None:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-            result_dict['VP'] = vp_nr
-            writer.writerow(result_dict)
-
-def count_TAs(lis):
-        return len(set(x[1] for x in lis))
+        for vp_nr, result_dict, records, tables, analysed in run_in_order(items(), workers):
+            counts['analysed' if analysed else 'up to date'] += 1
+            profiler.add_records(records)
+            if manifest is not None and 'rqa' in stages and 'rqa' not in outdated[vp_nr]:
+                # the recorded result of an up to date rqa stage
+                result_dict = manifest.row(vp_nr)
+            if exporter is not None:
+                if tables is None:
+                    # an up to date participant: its tables follow from the grids and the recorded result
+                    br_tier, ta_tier = load_participant(*paths[vp_nr], cache_path=cache_path)
+                    words_tier = load_words(words_files.get(vp_nr), cache_path)
+                    tables = export.participant_tables(vp_nr, gaze_events(br_tier, ta_tier, {'words': words_tier}),
+                                                       result_dict, withFive)
+                elif result_dict is not None and 'rqa' not in tables:
+                    # the rqa stage was up to date, only other stages ran
+                    tables['rqa'] = export.rqa_columns(vp_nr, result_dict)
+                exporter.add(tables)
+            if result_dict is not None:
+                print(json.dumps(result_dict, sort_keys=False, indent=4, separators=(',', ': ')))
+                if writer == None:
+                    writer = csv.DictWriter(csvfile, fieldnames=['VP'] + list(result_dict.keys()))
+                    writer.writeheader()
+                writer.writerow(dict(result_dict, VP=vp_nr))
+                csvfile.flush()
+
+            if manifest is not None and analysed:
+                for stage in outdated[vp_nr]:
+                    manifest.record(vp_nr, stage, fingerprints[vp_nr][stage],
+                                    participant_outputs(vp_nr, plain_plot, store_matrix, (stage,)),
+                                    result_dict if stage == 'rqa' else None)
+
+            # transition graphs are rendered in batches as the participants come in; graphs of unchanged
+            # participants only if their image is missing
+            dot_file = os.path.join(ANALYSEN_PATH, GRAPH_PATH, vp_nr + "_graph.dot")
+            if 'graphs' in stages and ('graphs' in outdated[vp_nr] or (os.path.exists(dot_file) and
+                                                    not os.path.exists(dot_file[:-4] + '.' + graph_format))):
+                dot_files.append(dot_file)
+            if len(dot_files) >= graphs.BATCH_SIZE:
+                with profiler.stage('graph rendering'):
+                    graphs.render(dot_files, graph_format)
+                dot_files = []
+    with profiler.stage('graph rendering'):
+        graphs.render(dot_files, graph_format)
+    if exporter is not None:
+        exporter.close()
+
+    if manifest is not None:
+        print("%(up to date)d participants were up to date, %(analysed)d analysed" % counts)
+        manifest.retain(fingerprints)
+        manifest.save()
+
+    if profiler.enabled:
+        print(profiler.summary())
+        profiler.write_report(profile_report or os.path.join(ANALYSEN_PATH, PROFILE_REPORT))
+
+
+def rqa_result_to_dict(rqa_result):
+    return {"Minimum diagonal line length (L_min)": float(rqa_result.min_diagonal_line_length),
+            "Minimum vertical line length (V_min)": float(rqa_result.min_vertical_line_length),
+            "Minimum white vertical line length (W_min)": float(rqa_result.min_white_vertical_line_length),
+            "Recurrence rate (RR)": float(rqa_result.recurrence_rate),
+            "Determinism (DET)": float(rqa_result.determinism),
+            "Average diagonal line length (L)": float(rqa_result.average_diagonal_line),
+            "Longest diagonal line length (L_max)": float(rqa_result.longest_diagonal_line),
+            "Divergence (DIV)": float(rqa_result.divergence),
+            "Entropy diagonal lines (L_entr)": float(rqa_result.entropy_diagonal_lines),
+            "Laminarity (LAM)": float(rqa_result.laminarity),
+            "Longest vertical line length (V_max)": float(rqa_result.longest_vertical_line),
+            "Entropy vertical lines (V_entr)": float(rqa_result.entropy_vertical_lines),
+            "Average white vertical line length (W)": float(rqa_result.average_white_vertical_line),
+            "Longest white vertical line length (W_max)": float(rqa_result.longest_white_vertical_line),
+            "Longest white vertical line length inverse (W_div)": float(rqa_result.longest_white_vertical_line_inverse),
+            "Entropy white vertical lines (W_entr)": float(rqa_result.entropy_white_vertical_lines),
+            "Ratio determinism / recurrence rate (DET/RR)": float(rqa_result.ratio_determinism_recurrence_rate),
+            "Ratio laminarity / determinism (LAM/DET)": float(rqa_result.ratio_laminarity_determinism)
+            }
+
 
 def to_json(rqa_result):
-    return json.dumps({"Minimum diagonal line length (L_min)": float(rqa_result.min_diagonal_line_length),
-                       "Minimum vertical line length (V_min)": float(rqa_result.min_vertical_line_length),
-                       "Minimum white vertical line length (W_min)": float(rqa_result.min_white_vertical_line_length),
-                       "Recurrence rate (RR)": float(rqa_result.recurrence_rate),
-                       "Determinism (DET)": float(rqa_result.determinism),
-                       "Average diagonal line length (L)": float(rqa_result.average_diagonal_line),
-                       "Longest diagonal line length (L_max)": float(rqa_result.longest_diagonal_line),
-                       "Divergence (DIV)": float(rqa_result.divergence),
-                       "Entropy diagonal lines (L_entr)": float(rqa_result.entropy_diagonal_lines),
-                       "Laminarity (LAM)": float(rqa_result.laminarity),
-                       "Longest vertical line length (V_max)": float(rqa_result.longest_vertical_line),
-                       "Entropy vertical lines (V_entr)": float(rqa_result.entropy_vertical_lines),
-                       "Average white vertical line length (W)": float(rqa_result.average_white_vertical_line),
-                       "Longest white vertical line length (W_max)": float(rqa_result.longest_white_vertical_line),
-                       "Longest white vertical line length inverse (W_div)": float(rqa_result.longest_white_vertical_line_inverse),
-                       "Entropy white vertical lines (W_entr)": float(rqa_result.entropy_white_vertical_lines),
-                       "Ratio determinism / recurrence rate (DET/RR)": float(rqa_result.ratio_determinism_recurrence_rate),
-                       "Ratio laminarity / determinism (LAM/DET)": float(rqa_result.ratio_laminarity_determinism)
-                       },
+    return json.dumps(rqa_result_to_dict(rqa_result),
                       sort_keys=False,
                       indent=4,
                       separators=(',', ': '))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Transition matrices, graphs and recurrence analysis of gaze '
+                                                 'directions for all participants in ' + VP_BLICKRICHTUNGEN_PATH)
+    parser.add_argument('command', nargs='?', choices=('all',) + STAGES, default='all',
+                        help='the stage to run: transitions (tables), rqa (measures and stored matrices), plots '
+                             '(recurrence plots), graphs (transition graphs) or all of them (default)')
+    parser.add_argument('--stages', nargs='+', choices=STAGES,
+                        help='run these stages instead of the one given by the command')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of worker processes; participants are analysed in parallel if > 1')
+    parser.add_argument('--no-cache', action='store_true', help='always parse the TextGrid files')
+    parser.add_argument('--rqa-backend', choices=RQA_BACKENDS, default='pyrqa',
+                        help='engine for the recurrence quantification (default: pyrqa)')
+    parser.add_argument('--tile-size', type=int, default=RQA_TILE_SIZE,
+                        help='rows and columns of the recurrence matrix the native backend holds in memory at a '
+                             'time (default: %(default)s)')
+    parser.add_argument('--no-plain-plot', action='store_true',
+                        help='only write the numbered recurrence plots, not the plain _recPlot.png')
+    parser.add_argument('--graph-format', choices=('png', 'svg', 'dot'), default='png',
+                        help="format of the transition graphs; 'dot' skips rendering (default: png)")
+    parser.add_argument('--incremental', action='store_true',
+                        help='only analyse participants whose TextGrids or settings changed since the last '
+                             'incremental run')
+    parser.add_argument('--profile', action='store_true',
+                        help='time the stages of the pipeline, print a summary and write a JSON report')
+    parser.add_argument('--profile-memory', action='store_true',
+                        help='also record the peak memory of every stage (tracemalloc, slow); implies --profile')
+    parser.add_argument('--profile-dir',
+                        help='write cProfile statistics of every participant to this directory; implies --profile')
+    parser.add_argument('--profile-report', default=os.path.join(ANALYSEN_PATH, PROFILE_REPORT),
+                        help='where the JSON report goes (default: %(default)s)')
+    parser.add_argument('--export', action='store_true',
+                        help='also write the gaze events, transitions and RQA measures of all participants as '
+                             'Parquet tables (compressed NumPy archives without pyarrow) to ' +
+                             os.path.join(ANALYSEN_PATH, EXPORT_PATH))
+    parser.add_argument('--no-matrix-store', action='store_true',
+                        help='do not keep the bit-packed recurrence matrices in ' +
+                             os.path.join(ANALYSEN_PATH, MATRIX_PATH))
+    args = parser.parse_args(argv)
+
+    if args.stages:
+        stages = tuple(stage for stage in STAGES if stage in args.stages)
+    else:
+        stages = STAGES if args.command == 'all' else (args.command,)
+    do_Analysis(withFive=True, cache_path=None if args.no_cache else CACHE_PATH, workers=args.workers,
+                backend=args.rqa_backend, tile_size=args.tile_size, plain_plot=not args.no_plain_plot,
+                graph_format=args.graph_format, incremental=args.incremental,
+                profiler=Profiler(args.profile, args.profile_memory, args.profile_dir),
+                profile_report=args.profile_report, export_tables=args.export,
+                store_matrix=not args.no_matrix_store, stages=stages)
+
+
 if __name__ == '__main__':
-    do_Analysis(withFive=True)
+    main()
@@ -0,0 +1,114 @@
+import contextlib
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+
+# stage() hands this out while profiling is off, so an instrumented block costs one function call
+_DISABLED = contextlib.nullcontext()
+
+
+class Profiler:
+    """named stage timers with optional peak memory (tracemalloc) and cProfile dumps per participant
+
+    Every `with profiler.stage(name, vp_nr)` block adds a record (stage, participant, seconds, peak
+    bytes). Worker processes profile with their own Profiler and hand their records back, see
+    take_records() and add_records().
+    """
+
+    def __init__(self, enabled=False, memory=False, profile_dir=None):
+        self.enabled = enabled or memory or profile_dir is not None
+        self.memory = memory
+        self.profile_dir = profile_dir
+        self.records = []
+        self._open = []
+        self.started = time.perf_counter()
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def settings(self):
+        # what a worker process needs to profile the same way
+        return self.enabled, self.memory, self.profile_dir
+
+    def stage(self, name, vp_nr=None):
+        if not self.enabled:
+            return _DISABLED
+        return self._stage(name, vp_nr)
+
+    def _peak(self):
+        # tracemalloc has one peak, which nested stages reset; the stages around them keep theirs here
+        peak = tracemalloc.get_traced_memory()[1]
+        for stage in self._open:
+            stage[1] = max(stage[1], peak)
+        return peak
+
+    @contextlib.contextmanager
+    def _stage(self, name, vp_nr):
+        if self.memory:
+            self._peak()
+            # reset_peak() needs Python 3.9; before that every stage reports the peak since tracing started
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            self._open.append([before, before])
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = {'stage': name, 'vp': vp_nr, 'seconds': time.perf_counter() - start}
+            if self.memory:
+                self._peak()
+                before, peak = self._open.pop()
+                record['peak_bytes'] = peak - before
+            self.records.append(record)
+
+    @contextlib.contextmanager
+    def participant(self, vp_nr):
+        # a whole participant; with profile_dir its cProfile statistics go to <profile_dir>/<vp_nr>.prof
+        if self.profile_dir is None:
+            with self.stage('participant', vp_nr):
+                yield
+            return
+        os.makedirs(self.profile_dir, exist_ok=True)
+        profile = cProfile.Profile()
+        with self.stage('participant', vp_nr):
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+                profile.dump_stats(os.path.join(self.profile_dir, vp_nr + '.prof'))
+
+    def take_records(self):
+        records, self.records = self.records, []
+        return records
+
+    def add_records(self, records):
+        self.records += records
+
+    def stages(self):
+        # per stage: number of calls, total and maximum seconds, maximum peak memory
+        stages = dict()
+        for record in self.records:
+            stage = stages.setdefault(record['stage'], {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            stage['calls'] += 1
+            stage['seconds'] += record['seconds']
+            stage['max_seconds'] = max(stage['max_seconds'], record['seconds'])
+            if 'peak_bytes' in record:
+                stage['peak_bytes'] = max(stage.get('peak_bytes', 0), record['peak_bytes'])
+        return stages
+
+    def summary(self):
+        lines = ['%-20s %6s %10s %10s %12s' % ('stage', 'calls', 'total s', 'max s', 'peak MiB')]
+        for name, stage in sorted(self.stages().items(), key=lambda item: -item[1]['seconds']):
+            peak = '%12.1f' % (stage['peak_bytes'] / 2 ** 20) if 'peak_bytes' in stage else '%12s' % '-'
+            lines.append('%-20s %6d %10.3f %10.3f %s' % (name, stage['calls'], stage['seconds'],
+                                                         stage['max_seconds'], peak))
+        lines.append('wall time %.3f s' % (time.perf_counter() - self.started))
+        return '\n'.join(lines)
+
+    def write_report(self, path):
+        with open(path, 'w') as file:
+            json.dump({'wall_seconds': time.perf_counter() - self.started, 'stages': self.stages(),
+                       'records': self.records}, file, indent=1)
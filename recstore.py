@@ -0,0 +1,86 @@
+import json
+import os
+
+import numpy as np
+
+import rqa
+
+# <name>.bits holds the matrix at one bit per cell, row by row in np.packbits layout; <name>.json its shape and
+# the settings it was computed with
+BITS_SUFFIX = '.bits'
+HEADER_SUFFIX = '.json'
+
+
+def write_matrix(path, matrix, **settings):
+    # stores a dense boolean matrix or a TiledRecurrenceMatrix under path (without suffix); tiled matrices are
+    # packed one row of tiles at a time straight into the mapped file
+    rows, columns = matrix.shape
+    width = (columns + 7) // 8
+    os.makedirs(os.path.dirname(path) or os.curdir, exist_ok=True)
+    if rows and width:
+        bits = np.memmap(path + BITS_SUFFIX + '.part', dtype=np.uint8, mode='w+', shape=(rows, width))
+        if isinstance(matrix, rqa.TiledRecurrenceMatrix):
+            matrix.packbits(out=bits)
+        else:
+            bits[:] = np.packbits(np.asarray(matrix, dtype=bool), axis=1)
+        bits.flush()
+        del bits
+    else:
+        open(path + BITS_SUFFIX + '.part', 'wb').close()
+    os.replace(path + BITS_SUFFIX + '.part', path + BITS_SUFFIX)
+    with open(path + HEADER_SUFFIX, 'w') as file:
+        json.dump(dict(settings, shape=[rows, columns]), file)
+
+
+class StoredRecurrenceMatrix(rqa.TiledRecurrenceMatrix):
+    """recurrence matrix written by write_matrix, opened lazily with np.memmap
+
+    Only the bytes of the requested rows and columns are read, so a region or the line counts of
+    the whole matrix (which go tile by tile, like the ones of TiledRecurrenceMatrix) never load
+    the whole file. region() gives a view of a part of the matrix that can be quantified or saved
+    as an image on its own.
+    """
+
+    def __init__(self, path, tile_size=1024):
+        with open(path + HEADER_SUFFIX) as file:
+            self.settings = json.load(file)
+        rows, columns = self.settings.pop('shape')
+        self.path = path
+        self.tile_size = tile_size
+        self.radius = self.settings.get('radius')
+        self.shape = (rows, columns)
+        self.origin = (0, 0)
+        if rows and columns:
+            self.bits = np.memmap(path + BITS_SUFFIX, dtype=np.uint8, mode='r', shape=(rows, (columns + 7) // 8))
+        else:
+            self.bits = np.zeros((rows, 0), dtype=np.uint8)
+
+    def block(self, row_start, row_stop, column_start, column_stop):
+        row_start, row_stop = row_start + self.origin[0], row_stop + self.origin[0]
+        column_start, column_stop = column_start + self.origin[1], column_stop + self.origin[1]
+        first_byte = column_start // 8
+        cells = np.unpackbits(self.bits[row_start:row_stop, first_byte:(column_stop + 7) // 8], axis=1)
+        return cells[:, column_start - 8 * first_byte:column_stop - 8 * first_byte].astype(bool)
+
+    def region(self, row_start, row_stop, column_start, column_stop):
+        # rows row_start..row_stop - 1 and columns column_start..column_stop - 1 as a matrix of their own,
+        # e.g. the block of one ThinkAnswer question
+        rows, columns = self.shape
+        if not (0 <= row_start <= row_stop <= rows and 0 <= column_start <= column_stop <= columns):
+            raise ValueError('region [%d:%d, %d:%d] is outside the %dx%d matrix'
+                             % (row_start, row_stop, column_start, column_stop, rows, columns))
+        view = object.__new__(StoredRecurrenceMatrix)
+        view.__dict__.update(self.__dict__)
+        view.shape = (row_stop - row_start, column_stop - column_start)
+        view.origin = (self.origin[0] + row_start, self.origin[1] + column_start)
+        return view
+
+    def quantify(self, theiler_corrector=None, min_line_length=None):
+        # RQAResult of the matrix (or region), by default with the settings it was stored with
+        if theiler_corrector is None:
+            theiler_corrector = self.settings.get('theiler_corrector', 1)
+        if min_line_length is None:
+            min_line_length = self.settings.get('min_line_length', 2)
+        return rqa.RQAResult.from_matrix(self, theiler_corrector, min_diagonal_line_length=min_line_length,
+                                         min_vertical_line_length=min_line_length,
+                                         min_white_vertical_line_length=min_line_length)
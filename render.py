@@ -0,0 +1,56 @@
+import numpy as np
+
+from rqa import TiledRecurrenceMatrix
+
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+
+
+def numbered_recurrence_plot(recurrence_matrix, numbers, number_colors, question_colors, condition_colors,
+                             withQuestions=True):
+    """recurrence plot with the gaze directions (and questions) drawn along the axes, as one RGB array
+
+    recurrence_matrix is a dense boolean array or a TiledRecurrenceMatrix, with the first point in row 0
+    (it is drawn at the bottom, like pyrqa does); numbers holds one (gaze direction, question, question
+    mark) per point. The layout is the one of the former add_numbers_to_recurrence_plot: a strip of gaze
+    colors left of and below the plot, and with withQuestions the question (even/odd) and condition
+    strips further to the left.
+    """
+    rows, columns = recurrence_matrix.shape
+    offset = 3 if withQuestions else 1
+    image = np.empty((rows + 1, columns + offset, 3), dtype=np.uint8)
+    image[:] = WHITE
+
+    plot = image[:rows, offset:]
+    if isinstance(recurrence_matrix, TiledRecurrenceMatrix):
+        for row_start in range(0, rows, recurrence_matrix.tile_size):
+            row_stop = min(row_start + recurrence_matrix.tile_size, rows)
+            block = recurrence_matrix.block(row_start, row_stop, 0, columns)
+            plot[rows - row_stop:rows - row_start][block[::-1]] = BLACK
+    else:
+        plot[np.asarray(recurrence_matrix, dtype=bool)[::-1]] = BLACK
+
+    # point n is drawn in row rows - 1 - n of the left strips and in column offset + n of the bottom strip
+    count = min(len(numbers), rows, columns)
+    numbers = numbers[:count]
+    left = np.arange(rows - 1, rows - 1 - count, -1)
+    gaze = _colors(number_colors, [int(number[0]) for number in numbers])
+    image[left, offset - 1] = gaze
+    image[rows, offset:offset + count] = gaze
+    if withQuestions:
+        image[left, offset - 2] = _colors(question_colors, [number[1] % 2 for number in numbers])
+        image[left, offset - 3] = _colors(condition_colors, [number[2][1] for number in numbers])
+    return image
+
+
+def _colors(color_dict, keys):
+    # (len(keys), 3) array of the colors of the keys; every distinct key is looked up once
+    unique, inverse = np.unique(np.array(keys), return_inverse=True)
+    palette = np.array([color_dict[key.item()] for key in unique], dtype=np.uint8).reshape(-1, 3)
+    return palette[inverse.reshape(-1)]
+
+
+def save_image(image, path):
+    # PIL is only imported once an image is actually written
+    from PIL import Image
+    Image.fromarray(image).save(path)
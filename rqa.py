@@ -0,0 +1,595 @@
+import math
+import struct
+import zlib
+
+import numpy as np
+
+
+def recurrence_matrix(series, radius, series_y=None):
+    # boolean recurrence matrix of a one-dimensional series (embedding dimension 1); two points recur
+    # if their euclidean distance is smaller than the radius, like pyrqa's FixedRadius neighbourhood.
+    # With series_y this is the cross recurrence matrix (rows: series_y, columns: series).
+    x = np.asarray(series, dtype=np.float64)
+    y = x if series_y is None else np.asarray(series_y, dtype=np.float64)
+    return np.square(y[:, None] - x[None, :]) < radius * radius
+
+
+def runs(block):
+    # (column, first row, row after the end) of every run of True down the columns of a 2d boolean array
+    rows, columns = block.shape
+    padded = np.zeros((columns, rows + 2), dtype=bool)
+    padded[:, 1:-1] = block.T
+    # changes alternate between the start and the end of a run in every (padded) column
+    changes = np.flatnonzero(padded[:, 1:] != padded[:, :-1])
+    starts, ends = changes[0::2], changes[1::2]
+    column = starts // (rows + 1)
+    return column, starts - column * (rows + 1), ends - column * (rows + 1)
+
+
+def radius_classes(series, radii):
+    # radii that let the same pairs of points recur get the same class: the number of distinct distances
+    # between the values of the series that are smaller than the radius. Class 1 means that only equal
+    # values recur (CategoricalRecurrence applies).
+    symbols = np.unique(series)
+    distances = np.unique(np.abs(symbols[:, None] - symbols[None, :]))
+    return [int(np.searchsorted(distances, radius, side='left')) for radius in radii]
+
+
+def run_lengths(block):
+    # lengths of all runs of True down the columns of a 2d boolean array
+    _, starts, ends = runs(block)
+    return ends - starts
+
+
+def frequency_distribution(lengths, size):
+    # histogram of line lengths; entry l-1 counts the lines of length l (pyrqa's layout)
+    return np.bincount(lengths, minlength=size + 1)[1:size + 1].astype(np.uint64)
+
+
+def skew(matrix):
+    # shifts row i of the matrix i places to the right (in a wider array), so that every diagonal of
+    # the matrix ends up in one column: column d holds the diagonal j - i = d - (rows - 1)
+    rows, columns = matrix.shape
+    skewed = np.zeros((rows, rows + columns - 1), dtype=bool)
+    row_index = np.arange(rows)[:, None]
+    skewed[row_index, np.arange(columns)[None, :] - row_index + rows - 1] = matrix
+    return skewed
+
+
+def diagonal_offsets(rows, columns, theiler_corrector):
+    # offsets of the diagonals that count for line detection; the Theiler corrector w excludes the
+    # diagonals with |j - i| < w
+    return np.abs(np.arange(-(rows - 1), columns)) >= theiler_corrector
+
+
+def line_distributions(matrix, theiler_corrector=1):
+    # recurrence points per column and the frequency distributions of diagonal, vertical and white
+    # vertical lines, counted the way pyrqa does (lines touching the border count, the Theiler
+    # corrector only applies to diagonal lines)
+    rows, columns = matrix.shape
+    size = max(rows, columns)
+    skewed = skew(matrix)[:, diagonal_offsets(rows, columns, theiler_corrector)]
+    return (matrix.sum(axis=0, dtype=np.uint64),
+            frequency_distribution(run_lengths(skewed), size),
+            frequency_distribution(run_lengths(matrix), size),
+            frequency_distribution(run_lengths(~matrix), size))
+
+
+class LineCounter:
+    """run lengths down a set of columns that arrive in consecutive blocks of rows
+
+    Runs that reach the end of a block are carried over to the next block of the same column,
+    so the counter only holds one int per column besides the histogram. With keep_columns, the
+    length and column of every line are kept as well (see LineStructure).
+    """
+
+    def __init__(self, columns, size, keep_columns=False):
+        self.carry = np.zeros(columns, dtype=np.int64)
+        self.histogram = np.zeros(size + 1, dtype=np.int64)
+        self.size = size
+        self.lines = [] if keep_columns else None
+
+    def _count(self, lengths, columns):
+        self.histogram += np.bincount(lengths, minlength=self.size + 1)
+        if self.lines is not None:
+            self.lines.append((lengths, columns))
+
+    def feed(self, block, columns=None, first=None, last=None):
+        # block: the next rows of the given (global) columns; a column's cells only span the rows
+        # first..last of the block (all rows if not given), everything outside has to be False
+        rows, width = block.shape
+        if rows == 0 or width == 0:
+            return
+        columns = np.arange(width) if columns is None else columns
+        first = np.zeros(width, dtype=np.int64) if first is None else first
+        last = np.full(width, rows - 1, dtype=np.int64) if last is None else last
+
+        column, starts, ends = runs(block)
+        lengths = ends - starts
+
+        # runs at the top of a column continue the carried run, runs at its bottom stay open
+        carried = starts == first[column]
+        lengths[carried] += self.carry[columns[column[carried]]]
+        still_open = ends == last[column] + 1
+        closing = columns[~block[first, np.arange(width)]]
+        closing = closing[self.carry[closing] > 0]
+        self._count(self.carry[closing], closing)
+        self._count(lengths[~still_open], columns[column[~still_open]])
+        self.carry[columns] = 0
+        self.carry[columns[column[still_open]]] = lengths[still_open]
+
+    def finish(self):
+        # frequency distribution in pyrqa's layout
+        open_columns = np.flatnonzero(self.carry)
+        self._count(self.carry[open_columns], open_columns)
+        self.carry[:] = 0
+        return self.histogram[1:].astype(np.uint64)
+
+    def line_columns(self):
+        # lengths and columns of all lines counted so far (needs keep_columns)
+        if not self.lines:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return (np.concatenate([lengths for lengths, _ in self.lines]).astype(np.int64),
+                np.concatenate([columns for _, columns in self.lines]).astype(np.int64))
+
+
+class LineStructure:
+    """recurrence points and lines of a recurrence matrix before any Theiler corrector is applied
+
+    Diagonal lines are kept with their offset (column - row), so the distributions for any Theiler
+    corrector, and the results for any minimum line lengths, follow without looking at the matrix
+    again. Used for parameter sweeps.
+    """
+
+    def __init__(self, shape, recurrence_points, diagonal_lengths, diagonal_offsets,
+                 vertical_frequency_distribution, white_vertical_frequency_distribution):
+        self.shape = shape
+        self.recurrence_points = recurrence_points
+        self.diagonal_lengths = diagonal_lengths
+        self.diagonal_offsets = diagonal_offsets
+        self.vertical_frequency_distribution = vertical_frequency_distribution
+        self.white_vertical_frequency_distribution = white_vertical_frequency_distribution
+
+    @classmethod
+    def from_matrix(cls, matrix):
+        # matrix: dense boolean array, TiledRecurrenceMatrix or CategoricalRecurrence
+        if isinstance(matrix, (TiledRecurrenceMatrix, CategoricalRecurrence)):
+            return matrix.line_structure()
+        rows, columns = matrix.shape
+        size = max(rows, columns)
+        column, starts, ends = runs(skew(matrix))
+        return cls(matrix.shape, matrix.sum(axis=0, dtype=np.uint64), ends - starts, column - (rows - 1),
+                   frequency_distribution(run_lengths(matrix), size),
+                   frequency_distribution(run_lengths(~matrix), size))
+
+    def line_distributions(self, theiler_corrector=1):
+        counted = np.abs(self.diagonal_offsets) >= theiler_corrector
+        return (self.recurrence_points,
+                frequency_distribution(self.diagonal_lengths[counted], max(self.shape)),
+                self.vertical_frequency_distribution,
+                self.white_vertical_frequency_distribution)
+
+
+class TiledRecurrenceMatrix:
+    """recurrence matrix that is computed tile by tile and never held in memory as a whole
+
+    Tiles of tile_size x tile_size are recomputed from the series whenever they are needed
+    (which is cheaper than storing them for embedding dimension 1), so peak memory is a few
+    tiles plus one int per column and diagonal, whatever the length of the series. packbits()
+    gives the whole matrix at one bit per cell if it is needed after all.
+    """
+
+    def __init__(self, series, radius, series_y=None, tile_size=1024):
+        self.x = np.asarray(series, dtype=np.float64)
+        self.y = self.x if series_y is None else np.asarray(series_y, dtype=np.float64)
+        self.radius = radius
+        self.tile_size = tile_size
+        self.shape = (len(self.y), len(self.x))
+
+    def block(self, row_start, row_stop, column_start, column_stop):
+        return recurrence_matrix(self.x[column_start:column_stop], self.radius, self.y[row_start:row_stop])
+
+    def tiles(self):
+        # (first row, first column, block) in row major order
+        rows, columns = self.shape
+        for row_start in range(0, rows, self.tile_size):
+            row_stop = min(row_start + self.tile_size, rows)
+            for column_start in range(0, columns, self.tile_size):
+                column_stop = min(column_start + self.tile_size, columns)
+                yield row_start, column_start, self.block(row_start, row_stop, column_start, column_stop)
+
+    def line_distributions(self, theiler_corrector=1):
+        # same as line_distributions(dense matrix); diagonals are followed across tiles by their offset
+        return self._count_lines(theiler_corrector)[:4]
+
+    def line_structure(self):
+        rows, columns = self.shape
+        recurrence_points, _, vertical, white, diagonal = self._count_lines(None)
+        lengths, diagonal_columns = diagonal.line_columns()
+        return LineStructure(self.shape, recurrence_points, lengths, diagonal_columns - (rows - 1), vertical, white)
+
+    def _count_lines(self, theiler_corrector):
+        # theiler_corrector None counts all diagonals and keeps their offsets in the returned diagonal counter
+        rows, columns = self.shape
+        size = max(rows, columns)
+        recurrence_points = np.zeros(columns, dtype=np.uint64)
+        vertical = LineCounter(columns, size)
+        white = LineCounter(columns, size)
+        diagonal = LineCounter(rows + columns - 1, size, keep_columns=theiler_corrector is None)
+
+        for row_start, column_start, block in self.tiles():
+            height, width = block.shape
+            column_index = np.arange(column_start, column_start + width)
+            recurrence_points[column_index] += block.sum(axis=0, dtype=np.uint64)
+            vertical.feed(block, column_index)
+            white.feed(~block, column_index)
+
+            # local diagonal d runs through rows first..last of the skewed tile; its global offset
+            # is column - row of any of its cells
+            local = np.arange(height + width - 1)
+            first = np.maximum(0, height - 1 - local)
+            last = np.minimum(height - 1, width + height - 2 - local)
+            offsets = local - (height - 1) + column_start - row_start
+            counted = np.abs(offsets) >= (theiler_corrector or 0)
+            diagonal.feed(skew(block)[:, counted], offsets[counted] + rows - 1, first[counted], last[counted])
+
+        return recurrence_points, diagonal.finish(), vertical.finish(), white.finish(), diagonal
+
+    def packbits(self, out=None):
+        # the whole matrix at one bit per cell (np.packbits layout), built one row of tiles at a time
+        rows, columns = self.shape
+        if out is None:
+            out = np.empty((rows, (columns + 7) // 8), dtype=np.uint8)
+        for row_start in range(0, rows, self.tile_size):
+            row_stop = min(row_start + self.tile_size, rows)
+            out[row_start:row_stop] = np.packbits(self.block(row_start, row_stop, 0, columns), axis=1)
+        return out
+
+    def save_image(self, path):
+        # recurrence plot like pyrqa's ImageGenerator (recurrences black, first row at the bottom), written
+        # as a 1 bit grayscale PNG one row of tiles at a time, so not even the image is held in memory
+        rows, columns = self.shape
+        compressor = zlib.compressobj()
+        with open(path, 'wb') as file:
+            file.write(b'\x89PNG\r\n\x1a\n')
+            _write_png_chunk(file, b'IHDR', struct.pack('>IIBBBBB', columns, rows, 1, 0, 0, 0, 0))
+            for row_stop in range(rows, 0, -self.tile_size):
+                row_start = max(row_stop - self.tile_size, 0)
+                packed = np.packbits(~self.block(row_start, row_stop, 0, columns)[::-1], axis=1)
+                # every PNG row starts with its filter type, 0 (none)
+                scanlines = np.zeros((packed.shape[0], packed.shape[1] + 1), dtype=np.uint8)
+                scanlines[:, 1:] = packed
+                _write_png_chunk(file, b'IDAT', compressor.compress(scanlines.tobytes()))
+            _write_png_chunk(file, b'IDAT', compressor.flush())
+            _write_png_chunk(file, b'IEND', b'')
+
+
+class JointRecurrenceMatrix(TiledRecurrenceMatrix):
+    """joint recurrence matrix of two series: points i and j recur if they recur in both series
+
+    Both series are cut to the length of the shorter one. Tiles are computed like the ones of
+    TiledRecurrenceMatrix, so the same line counting and images apply.
+    """
+
+    def __init__(self, series, other_series, radius, tile_size=1024):
+        length = min(len(series), len(other_series))
+        TiledRecurrenceMatrix.__init__(self, np.asarray(series, dtype=np.float64)[:length], radius,
+                                       tile_size=tile_size)
+        self.other = np.asarray(other_series, dtype=np.float64)[:length]
+
+    def block(self, row_start, row_stop, column_start, column_stop):
+        return (TiledRecurrenceMatrix.block(self, row_start, row_stop, column_start, column_stop) &
+                recurrence_matrix(self.other[column_start:column_stop], self.radius,
+                                  self.other[row_start:row_stop]))
+
+
+def _write_png_chunk(file, kind, data):
+    if data or kind == b'IEND':
+        file.write(struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data)))
+
+
+class CategoricalRecurrence:
+    """recurrence of categorical series, found through an index of the positions of every symbol
+
+    If the radius is smaller than the distance between any two distinct values, two points recur
+    exactly if they are the same symbol (the gaze directions 0-9 with radius 0.65). Then the
+    vertical and white vertical lines of a column only depend on its symbol and follow from the
+    runs of that symbol in the series, and the diagonal lines from the R recurrent points, so
+    nothing is of order N^2 unless the recurrences are.
+    """
+
+    def __init__(self, series, radius, series_y=None):
+        x = np.asarray(series, dtype=np.float64)
+        y = x if series_y is None else np.asarray(series_y, dtype=np.float64)
+        self.symbols, codes = np.unique(np.concatenate([x, y]), return_inverse=True)
+        if radius <= 0 or (len(self.symbols) > 1 and radius > np.diff(self.symbols).min()):
+            raise ValueError('radius %s does not separate the symbols %s' % (radius, self.symbols.tolist()))
+        self.x_codes, self.y_codes = codes[:len(x)], codes[len(x):]
+        self.symmetric = series_y is None
+        self.shape = (len(y), len(x))
+
+    def positions(self, codes):
+        # per-symbol position index: positions[bounds[s]:bounds[s + 1]] are where symbol s occurs
+        bounds = np.zeros(len(self.symbols) + 1, dtype=np.int64)
+        bounds[1:] = np.cumsum(np.bincount(codes, minlength=len(self.symbols)))
+        return np.argsort(codes, kind='stable'), bounds
+
+    def points(self, upper=False):
+        # rows and columns of all recurrent points, or of those above the main diagonal only
+        x_positions, x_bounds = self.positions(self.x_codes)
+        y_positions, y_bounds = self.positions(self.y_codes)
+        rows, columns = [], []
+        for symbol in range(len(self.symbols)):
+            x_at = x_positions[x_bounds[symbol]:x_bounds[symbol + 1]]
+            y_at = y_positions[y_bounds[symbol]:y_bounds[symbol + 1]]
+            if upper:
+                first, second = np.triu_indices(len(x_at), 1)
+                rows.append(x_at[first])
+                columns.append(x_at[second])
+            else:
+                rows.append(np.repeat(y_at, len(x_at)))
+                columns.append(np.tile(x_at, len(y_at)))
+        return np.concatenate(rows), np.concatenate(columns)
+
+    def symbol_runs(self):
+        # run length encoding of the row series: symbol, first row and row after the end of every run
+        change = np.flatnonzero(self.y_codes[1:] != self.y_codes[:-1]) + 1
+        starts = np.concatenate([[0], change])
+        ends = np.concatenate([change, [len(self.y_codes)]])
+        return self.y_codes[starts], starts, ends
+
+    def line_distributions(self, theiler_corrector=1):
+        # same as line_distributions(dense matrix)
+        return self.line_structure().line_distributions(theiler_corrector)
+
+    def line_structure(self):
+        rows, columns = self.shape
+        size = max(rows, columns)
+        column_counts = np.bincount(self.x_codes, minlength=len(self.symbols))
+        row_counts = np.bincount(self.y_codes, minlength=len(self.symbols))
+        recurrence_points = row_counts[self.x_codes].astype(np.uint64)
+        if rows == 0 or columns == 0:
+            empty = np.zeros(size, dtype=np.uint64)
+            no_lines = np.zeros(0, dtype=np.int64)
+            return LineStructure(self.shape, recurrence_points, no_lines, no_lines.copy(), empty, empty.copy())
+
+        # a column of symbol s has a vertical line for every run of s in the rows
+        symbol, starts, ends = self.symbol_runs()
+        vertical = _weighted_distribution(ends - starts, column_counts[symbol], size)
+
+        # and a white line for every gap before, between and after those runs
+        order = np.argsort(symbol, kind='stable')
+        symbol, starts, ends = symbol[order], starts[order], ends[order]
+        new_symbol = np.concatenate([[True], symbol[1:] != symbol[:-1]])
+        last_run = np.concatenate([new_symbol[1:], [True]])
+        between = ~new_symbol[1:]
+        absent = np.flatnonzero(row_counts == 0)
+        white = _weighted_distribution(
+            np.concatenate([starts[new_symbol], rows - ends[last_run], starts[1:][between] - ends[:-1][between],
+                            np.full(len(absent), rows)]),
+            np.concatenate([column_counts[symbol[new_symbol]], column_counts[symbol[last_run]],
+                            column_counts[symbol[1:][between]], column_counts[absent]]),
+            size)
+
+        # diagonal lines: recurrent points sorted by diagonal, then row; a line breaks wherever the
+        # sort key does not grow by exactly one (the stride leaves a gap between the diagonals)
+        upper = self.symmetric
+        point_rows, point_columns = self.points(upper)
+        keys = np.sort((point_columns - point_rows + rows - 1) * (rows + 1) + point_rows)
+        line_starts = np.concatenate([[0], np.flatnonzero(np.diff(keys) != 1) + 1]) if len(keys) else keys
+        lengths = np.diff(np.concatenate([line_starts, [len(keys)]]))
+        offsets = keys[line_starts] // (rows + 1) - (rows - 1)
+        if upper:
+            # the lower triangle mirrors the upper one, the main diagonal is a single line
+            lengths = np.concatenate([lengths, lengths, [rows]])
+            offsets = np.concatenate([offsets, -offsets, [0]])
+        return LineStructure(self.shape, recurrence_points, lengths.astype(np.int64), offsets.astype(np.int64),
+                             vertical, white)
+
+
+def _weighted_distribution(lengths, weights, size):
+    distribution = np.bincount(lengths, weights=weights, minlength=size + 1)[1:size + 1]
+    return np.rint(distribution).astype(np.uint64)
+
+
+class RQAResult:
+    """RQA measures computed from line length frequency distributions
+
+    Mirrors the attributes of pyrqa's RQAResult (min_*_line_length can be changed after the fact), so
+    to_json and the text dumps work with results of either backend.
+    """
+
+    def __init__(self, number_of_vectors_x, number_of_vectors_y, recurrence_points,
+                 diagonal_frequency_distribution, vertical_frequency_distribution,
+                 white_vertical_frequency_distribution, min_diagonal_line_length=2,
+                 min_vertical_line_length=2, min_white_vertical_line_length=2, headline="RQA Result"):
+        self.number_of_vectors_x = number_of_vectors_x
+        self.number_of_vectors_y = number_of_vectors_y
+        self.recurrence_points = recurrence_points
+        self.diagonal_frequency_distribution = diagonal_frequency_distribution
+        self.vertical_frequency_distribution = vertical_frequency_distribution
+        self.white_vertical_frequency_distribution = white_vertical_frequency_distribution
+        self.min_diagonal_line_length = min_diagonal_line_length
+        self.min_vertical_line_length = min_vertical_line_length
+        self.min_white_vertical_line_length = min_white_vertical_line_length
+        self.headline = headline
+        # the pairs of vectors the recurrence rate is taken over (fewer for from_blocks)
+        self.number_of_cells = number_of_vectors_x * number_of_vectors_y
+
+    @classmethod
+    def from_matrix(cls, matrix, theiler_corrector=1, **kwargs):
+        # matrix: dense boolean array, TiledRecurrenceMatrix, CategoricalRecurrence or LineStructure
+        rows, columns = matrix.shape
+        if isinstance(matrix, (TiledRecurrenceMatrix, CategoricalRecurrence, LineStructure)):
+            distributions = matrix.line_distributions(theiler_corrector)
+        else:
+            distributions = line_distributions(matrix, theiler_corrector)
+        return cls(columns, rows, *distributions, **kwargs)
+
+    @classmethod
+    def from_blocks(cls, matrices, theiler_corrector=1, **kwargs):
+        # one result for several matrices taken as the diagonal blocks of a bigger one (e.g. the contiguous runs
+        # of a group of points): recurrence points and line distributions add up, and the pairs between the
+        # blocks are left out, of the lines as well as of the recurrence rate
+        results = [cls.from_matrix(matrix, theiler_corrector) for matrix in matrices]
+        size = max(result.diagonal_frequency_distribution.size for result in results)
+
+        def total(name):
+            distribution = np.zeros(size, dtype=np.uint64)
+            for result in results:
+                part = getattr(result, name)
+                distribution[:part.size] += part
+            return distribution
+
+        combined = cls(sum(result.number_of_vectors_x for result in results),
+                       sum(result.number_of_vectors_y for result in results),
+                       np.concatenate([result.recurrence_points for result in results]),
+                       total('diagonal_frequency_distribution'), total('vertical_frequency_distribution'),
+                       total('white_vertical_frequency_distribution'), **kwargs)
+        combined.number_of_cells = sum(result.number_of_cells for result in results)
+        return combined
+
+    @staticmethod
+    def _lines(distribution, min_length):
+        lengths = np.arange(1, distribution.size + 1)
+        counts = distribution[min_length - 1:].astype(np.float64)
+        return counts.sum(), (lengths[min_length - 1:] * counts).sum()
+
+    @staticmethod
+    def _entropy(distribution, min_length):
+        counts = distribution[min_length - 1:].astype(np.float64)
+        counts = counts[counts > 0]
+        if counts.size == 0:
+            return 0.0
+        p = counts / counts.sum()
+        # max() turns the -0.0 of a single line length into 0.0
+        return max(0.0, float(-np.sum(p * np.log(p))))
+
+    @staticmethod
+    def _longest(distribution):
+        nonzero = np.flatnonzero(distribution)
+        return int(nonzero[-1] + 1) if nonzero.size else 0
+
+    @staticmethod
+    def _ratio(numerator, denominator):
+        return numerator / denominator if denominator else math.nan
+
+    @property
+    def number_of_recurrence_points(self):
+        return float(np.sum(self.recurrence_points))
+
+    @property
+    def recurrence_rate(self):
+        return self._ratio(self.number_of_recurrence_points, self.number_of_cells)
+
+    @property
+    def determinism(self):
+        return self._ratio(self._lines(self.diagonal_frequency_distribution, self.min_diagonal_line_length)[1],
+                           self._lines(self.diagonal_frequency_distribution, 1)[1])
+
+    @property
+    def average_diagonal_line(self):
+        return self._ratio(*reversed(self._lines(self.diagonal_frequency_distribution,
+                                                 self.min_diagonal_line_length)))
+
+    @property
+    def longest_diagonal_line(self):
+        return self._longest(self.diagonal_frequency_distribution)
+
+    @property
+    def divergence(self):
+        return self._ratio(1.0, self.longest_diagonal_line)
+
+    @property
+    def entropy_diagonal_lines(self):
+        return self._entropy(self.diagonal_frequency_distribution, self.min_diagonal_line_length)
+
+    @property
+    def laminarity(self):
+        return self._ratio(self._lines(self.vertical_frequency_distribution, self.min_vertical_line_length)[1],
+                           self._lines(self.vertical_frequency_distribution, 1)[1])
+
+    @property
+    def trapping_time(self):
+        return self._ratio(*reversed(self._lines(self.vertical_frequency_distribution,
+                                                 self.min_vertical_line_length)))
+
+    @property
+    def longest_vertical_line(self):
+        return self._longest(self.vertical_frequency_distribution)
+
+    @property
+    def entropy_vertical_lines(self):
+        return self._entropy(self.vertical_frequency_distribution, self.min_vertical_line_length)
+
+    @property
+    def average_white_vertical_line(self):
+        return self._ratio(*reversed(self._lines(self.white_vertical_frequency_distribution,
+                                                 self.min_white_vertical_line_length)))
+
+    @property
+    def longest_white_vertical_line(self):
+        return self._longest(self.white_vertical_frequency_distribution)
+
+    @property
+    def longest_white_vertical_line_inverse(self):
+        return self._ratio(1.0, self.longest_white_vertical_line)
+
+    @property
+    def entropy_white_vertical_lines(self):
+        return self._entropy(self.white_vertical_frequency_distribution, self.min_white_vertical_line_length)
+
+    @property
+    def ratio_determinism_recurrence_rate(self):
+        return self._ratio(self.determinism, self.recurrence_rate)
+
+    @property
+    def ratio_laminarity_determinism(self):
+        return self._ratio(self.laminarity, self.determinism)
+
+    def __str__(self):
+        # same layout as pyrqa's text dump
+        return "%s:\n" \
+               "%s\n" \
+               "\n" \
+               "Minimum diagonal line length (L_min): %d\n" \
+               "Minimum vertical line length (V_min): %d\n" \
+               "Minimum white vertical line length (W_min): %d\n" \
+               "\n" \
+               "Recurrence rate (RR): %f\n" \
+               "Determinism (DET): %f\n" \
+               "Average diagonal line length (L): %f\n" \
+               "Longest diagonal line length (L_max): %d\n" \
+               "Divergence (DIV): %f\n" \
+               "Entropy diagonal lines (L_entr): %f\n" \
+               "Laminarity (LAM): %f\n" \
+               "Trapping time (TT): %f\n" \
+               "Longest vertical line length (V_max): %d\n" \
+               "Entropy vertical lines (V_entr): %f\n" \
+               "Average white vertical line length (W): %f\n" \
+               "Longest white vertical line length (W_max): %d\n" \
+               "Longest white vertical line length inverse (W_div): %f\n" \
+               "Entropy white vertical lines (W_entr): %f\n" \
+               "\n" \
+               "Ratio determinism / recurrence rate (DET/RR): %f\n" \
+               "Ratio laminarity / determinism (LAM/DET): %f\n" % (self.headline,
+                                                                   "=" * (len(self.headline) + 1),
+                                                                   self.min_diagonal_line_length,
+                                                                   self.min_vertical_line_length,
+                                                                   self.min_white_vertical_line_length,
+                                                                   self.recurrence_rate,
+                                                                   self.determinism,
+                                                                   self.average_diagonal_line,
+                                                                   self.longest_diagonal_line,
+                                                                   self.divergence,
+                                                                   self.entropy_diagonal_lines,
+                                                                   self.laminarity,
+                                                                   self.trapping_time,
+                                                                   self.longest_vertical_line,
+                                                                   self.entropy_vertical_lines,
+                                                                   self.average_white_vertical_line,
+                                                                   self.longest_white_vertical_line,
+                                                                   self.longest_white_vertical_line_inverse,
+                                                                   self.entropy_white_vertical_lines,
+                                                                   self.ratio_determinism_recurrence_rate,
+                                                                   self.ratio_laminarity_determinism)
@@ -0,0 +1,117 @@
+import argparse
+import csv
+import itertools
+import os
+
+import numpy as np
+
+import rqa
+from main import (ANALYSEN_PATH, CACHE_PATH, RQA_MIN_LINE_LENGTH, RQA_RADIUS, RQA_THEILER_CORRECTOR, RQA_TILE_SIZE,
+                  iter_participants, load_participant, recurrence_points, rqa_result_to_dict, run_jobs)
+
+# the parameters a sweep runs over and the columns of its results, in this order
+PARAMETERS = ('withFive', 'radius', 'theiler_corrector', 'min_diagonal_line_length', 'min_vertical_line_length',
+              'min_white_vertical_line_length')
+DEFAULT_GRID = {'withFive': [True], 'radius': [RQA_RADIUS], 'theiler_corrector': [RQA_THEILER_CORRECTOR],
+                'min_diagonal_line_length': [RQA_MIN_LINE_LENGTH], 'min_vertical_line_length': [RQA_MIN_LINE_LENGTH],
+                'min_white_vertical_line_length': [RQA_MIN_LINE_LENGTH]}
+# minimum line lengths are parameter columns of the sweep, not measures
+MIN_LENGTH_MEASURES = ("Minimum diagonal line length (L_min)", "Minimum vertical line length (V_min)",
+                       "Minimum white vertical line length (W_min)")
+SWEEP_RESULTS = 'RqaSweep.csv'
+
+
+def sweep_series(series, grid, tile_size=RQA_TILE_SIZE):
+    # (parameters, result dict) for every combination of radius, Theiler corrector and minimum line lengths.
+    # The recurrence structure is computed once per radius class and the lines are counted once per Theiler
+    # corrector; the minimum line lengths only change how the shared histograms are read.
+    structures = dict()
+    for radius, radius_class in zip(grid['radius'], rqa.radius_classes(series, grid['radius'])):
+        if radius_class not in structures:
+            if radius_class == 1:
+                # only equal symbols recur
+                matrix = rqa.CategoricalRecurrence(series, radius)
+            else:
+                matrix = rqa.TiledRecurrenceMatrix(series, radius, tile_size=tile_size)
+            structures[radius_class] = rqa.LineStructure.from_matrix(matrix)
+
+        for theiler_corrector in grid['theiler_corrector']:
+            result = rqa.RQAResult.from_matrix(structures[radius_class], theiler_corrector)
+            for min_lengths in itertools.product(grid['min_diagonal_line_length'], grid['min_vertical_line_length'],
+                                                 grid['min_white_vertical_line_length']):
+                (result.min_diagonal_line_length, result.min_vertical_line_length,
+                 result.min_white_vertical_line_length) = min_lengths
+                yield (radius, theiler_corrector) + min_lengths, rqa_result_to_dict(result)
+
+
+def sweep_participant(vp_nr, br_path, ta_path, grid, cache_path=CACHE_PATH, tile_size=RQA_TILE_SIZE):
+    # long format rows (one per measure and parameter combination) for one participant
+    br_tier, ta_tier = load_participant(br_path, ta_path, cache_path)
+    points = recurrence_points(br_tier, ta_tier)
+
+    rows = []
+    for withFive in grid['withFive']:
+        # without withFive the points on direction 5 are left out of the series
+        series = np.array([float(point[0]) for point in points if withFive or point[0] != '5'])
+        if len(series) == 0:
+            print("No recurrence points for %s (withFive=%s), skipping" % (vp_nr, withFive))
+            continue
+        for parameters, result_dict in sweep_series(series, grid, tile_size):
+            values = dict(zip(PARAMETERS, (withFive,) + parameters), VP=vp_nr)
+            rows += [dict(values, measure=measure, value=value)
+                     for measure, value in result_dict.items() if measure not in MIN_LENGTH_MEASURES]
+    return rows
+
+
+def run_sweep(grid, output=os.path.join(ANALYSEN_PATH, SWEEP_RESULTS), workers=1, cache_path=CACHE_PATH,
+              tile_size=RQA_TILE_SIZE):
+    grid = dict(DEFAULT_GRID, **grid)
+    jobs = [(vp_nr, br_path, ta_path, grid, cache_path, tile_size) for vp_nr, br_path, ta_path in iter_participants()]
+
+    with open(output, 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=('VP',) + PARAMETERS + ('measure', 'value'))
+        writer.writeheader()
+        for rows in run_jobs(sweep_participant, jobs, workers):
+            writer.writerows(rows)
+
+
+def _yes_no(value):
+    if value.lower() in ('yes', 'true', '1'):
+        return True
+    if value.lower() in ('no', 'false', '0'):
+        return False
+    raise argparse.ArgumentTypeError('expected yes or no, got %r' % value)
+
+
+def _line_length(value):
+    # a line has at least one point; RQAResult counts the lines from distribution[min_length - 1:] on
+    length = int(value)
+    if length < 1:
+        raise argparse.ArgumentTypeError('minimum line lengths are at least 1, got %d' % length)
+    return length
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='RQA of all participants for every combination of the given '
+                                                 'parameters, written as one long format table')
+    parser.add_argument('--radius', type=float, nargs='+', default=DEFAULT_GRID['radius'])
+    parser.add_argument('--theiler', type=int, nargs='+', default=DEFAULT_GRID['theiler_corrector'],
+                        help='Theiler corrector(s)')
+    parser.add_argument('--lmin', type=_line_length, nargs='+', default=DEFAULT_GRID['min_diagonal_line_length'],
+                        help='minimum diagonal line length(s)')
+    parser.add_argument('--vmin', type=_line_length, nargs='+', default=DEFAULT_GRID['min_vertical_line_length'],
+                        help='minimum vertical line length(s)')
+    parser.add_argument('--wmin', type=_line_length, nargs='+', default=DEFAULT_GRID['min_white_vertical_line_length'],
+                        help='minimum white vertical line length(s)')
+    parser.add_argument('--with-five', type=_yes_no, nargs='+', default=DEFAULT_GRID['withFive'],
+                        help='yes and/or no: whether the points on gaze direction 5 are part of the series')
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes')
+    parser.add_argument('--output', default=os.path.join(ANALYSEN_PATH, SWEEP_RESULTS))
+    parser.add_argument('--no-cache', action='store_true', help='always parse the TextGrid files')
+    parser.add_argument('--tile-size', type=int, default=RQA_TILE_SIZE)
+    args = parser.parse_args()
+
+    run_sweep({'withFive': args.with_five, 'radius': args.radius, 'theiler_corrector': args.theiler,
+               'min_diagonal_line_length': args.lmin, 'min_vertical_line_length': args.vmin,
+               'min_white_vertical_line_length': args.wmin},
+              args.output, args.workers, None if args.no_cache else CACHE_PATH, args.tile_size)
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# the scripts live in the repository root and praatclasses in the bundled virtualenv
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'virtualEnv', 'lib', 'python3.5', 'site-packages')]
@@ -0,0 +1,20 @@
+import numpy as np
+
+import export
+
+
+def test_npz_export_joins_the_participants(tmp_path, monkeypatch):
+    monkeypatch.setattr(export, '_pyarrow', lambda: None)
+    chunks = [{'VP': np.full(3, 'vp1'), 'mark': np.array(['a', 'bb', '']), 'xmin': np.arange(3.0)},
+              {'VP': np.full(0, 'vp2'), 'mark': np.array([], dtype=str), 'xmin': np.zeros(0)},
+              {'VP': np.full(2, '2_vp11'), 'mark': np.array(['cccc', 'd']), 'xmin': np.array([5.0, 6.5])}]
+    exporter = export.ColumnarExport(str(tmp_path))
+    for columns in chunks:
+        exporter.add({'events': columns})
+    exporter.close()
+
+    table = export.load_table(str(tmp_path / 'events.npz'))
+    assert list(table) == ['VP', 'mark', 'xmin']
+    for column in table:
+        np.testing.assert_array_equal(table[column], np.concatenate([chunk[column] for chunk in chunks]))
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['events.npz']
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from gaze import repeat_mask
+
+
+def remove_doubles_from_list(data_points, func=lambda x: x):
+    # the original de-dup of main.py, kept here as the reference
+    dic = dict()
+    to_remove = []
+    for n in range(len(data_points)):
+        dic[n] = data_points[n]
+    for key in dic:
+        if key == 0 or key-1 in to_remove:
+            continue
+        prev = func(dic[key-1])
+        this = func(dic[key])
+        try:
+            nex = func(dic[key+1])
+        except KeyError:
+            nex = "False"
+        if len(prev) > 1:
+            if prev[0] == this[0]:
+                if prev[1] == this[1] or this[1] == nex[1]:
+                    to_remove.append(key)
+        elif prev == this:
+            to_remove.append(key)
+    for n in to_remove:
+        del dic[n]
+    return list(dic.values())
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_repeat_mask_keeps_what_remove_doubles_from_list_kept(seed):
+    rng = np.random.default_rng(seed)
+    # few directions and short questions, so that runs of repeats and question changes within them are common
+    codes = rng.integers(0, 3, size=int(rng.integers(0, 60)))
+    questions = np.cumsum(rng.random(len(codes)) < 0.2)
+    marks = [str(code) for code in codes]
+
+    tagged = [(mark, int(question), 'T%d' % question) for mark, question in zip(marks, questions)]
+    expected = remove_doubles_from_list(tagged, lambda x: x[:2])
+    assert [tagged[i] for i in np.flatnonzero(repeat_mask(codes, questions))] == expected
+
+    expected = remove_doubles_from_list(marks)
+    assert [marks[i] for i in np.flatnonzero(repeat_mask(codes))] == expected
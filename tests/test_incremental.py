@@ -0,0 +1,71 @@
+import os
+
+import pytest
+
+import main
+from incremental import Manifest
+
+
+@pytest.fixture
+def participant(tmp_path):
+    # two input grids, one output per stage and a manifest that has recorded both stages
+    paths = {name: str(tmp_path / name) for name in ('br.TextGrid', 'ta.TextGrid', 'plot.png', 'table.csv')}
+    for path in paths.values():
+        with open(path, 'w') as file:
+            file.write('contents of ' + os.path.basename(path))
+    manifest = Manifest(str(tmp_path / 'manifest.json'))
+    for stage, output in (('plots', 'plot.png'), ('transitions', 'table.csv')):
+        inputs, settings = main.stage_dependencies(stage, paths['br.TextGrid'], paths['ta.TextGrid'])
+        manifest.record('vp1', stage, manifest.fingerprint(inputs, settings), [paths[output]])
+    return manifest, paths
+
+
+def current(manifest, paths, stage, **settings):
+    inputs, settings = main.stage_dependencies(stage, paths['br.TextGrid'], paths['ta.TextGrid'], **settings)
+    return manifest.is_current('vp1', stage, manifest.fingerprint(inputs, settings))
+
+
+def test_unchanged_stages_are_current_after_a_reload(participant):
+    manifest, paths = participant
+    manifest.save()
+    manifest = Manifest(manifest.path)
+    assert current(manifest, paths, 'plots') and current(manifest, paths, 'transitions')
+    assert not current(manifest, paths, 'rqa')
+
+
+def test_a_setting_only_invalidates_the_stages_it_changes(participant):
+    manifest, paths = participant
+    assert not current(manifest, paths, 'plots', plain_plot=False)
+    assert current(manifest, paths, 'transitions', plain_plot=False)
+    assert not current(manifest, paths, 'transitions', withFive=False)
+
+
+def test_an_edited_input_invalidates_the_stages_that_read_it(participant):
+    manifest, paths = participant
+    with open(paths['ta.TextGrid'], 'a') as file:
+        file.write(' edited')
+    assert not current(manifest, paths, 'plots')
+    assert current(manifest, paths, 'transitions')
+    with open(paths['br.TextGrid'], 'a') as file:
+        file.write(' edited')
+    assert not current(manifest, paths, 'transitions')
+
+
+def test_a_missing_or_rewritten_output_invalidates_its_stage(participant):
+    manifest, paths = participant
+    stat = os.stat(paths['plot.png'])
+    os.utime(paths['plot.png'], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert not current(manifest, paths, 'plots')
+    assert current(manifest, paths, 'transitions')
+    os.remove(paths['table.csv'])
+    assert not current(manifest, paths, 'transitions')
+
+
+def test_recording_a_stage_keeps_the_others(participant):
+    manifest, paths = participant
+    inputs, settings = main.stage_dependencies('rqa', paths['br.TextGrid'], paths['ta.TextGrid'])
+    manifest.record('vp1', 'rqa', manifest.fingerprint(inputs, settings), [], row={'RR': 0.5})
+    manifest.record('vp1', 'plots', manifest.fingerprint(*main.stage_dependencies(
+        'plots', paths['br.TextGrid'], paths['ta.TextGrid'])), [paths['plot.png']])
+    assert current(manifest, paths, 'rqa') and current(manifest, paths, 'transitions')
+    assert manifest.row('vp1') == {'RR': 0.5}
@@ -0,0 +1,76 @@
+import csv
+import os
+
+import numpy as np
+import pytest
+
+import main
+import rqa
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# pyrqa computes in float32, so the committed results only agree to about seven digits
+RTOL = 1e-6
+
+
+def committed_results():
+    with open(os.path.join(ROOT, main.ANALYSEN_PATH, 'OverallRqaResults.csv'), newline='') as csvfile:
+        return {row.pop('VP'): {measure: float(value) for measure, value in row.items()}
+                for row in csv.DictReader(csvfile)}
+
+
+def participants():
+    ta_files = main.find_grids(os.path.join(ROOT, main.VP_THINKANSWER_PATH))
+    br_files = main.find_grids(os.path.join(ROOT, main.VP_BLICKRICHTUNGEN_PATH))
+    return [(vp_nr, br_files[vp_nr], ta_files[vp_nr]) for vp_nr in sorted(br_files) if vp_nr in ta_files]
+
+
+@pytest.mark.parametrize('backend', ['native', 'categorical'])
+def test_backends_reproduce_committed_results(backend, capsys):
+    # the results of pyrqa in Analysen/OverallRqaResults.csv, for every sample participant
+    expected = committed_results()
+    assert len(expected) == len(participants())
+    for vp_nr, br_path, ta_path in participants():
+        series = [float(point[0]) for point in main.recurrence_points(*main.load_participant(br_path, ta_path, None))]
+        if backend == 'categorical':
+            matrix = rqa.CategoricalRecurrence(series, main.RQA_RADIUS)
+        else:
+            matrix = rqa.TiledRecurrenceMatrix(series, main.RQA_RADIUS, tile_size=64)
+        result = main.rqa_result_to_dict(rqa.RQAResult.from_matrix(matrix, main.RQA_THEILER_CORRECTOR,
+                                                                   **main.RQA_LINE_LENGTHS))
+        assert list(result) == list(expected[vp_nr])
+        for measure, value in result.items():
+            assert value == pytest.approx(expected[vp_nr][measure], rel=RTOL, abs=1e-12), (vp_nr, measure)
+    capsys.readouterr()
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_tiled_and_categorical_match_dense(seed):
+    rng = np.random.default_rng(seed)
+    series = rng.integers(0, 10, rng.integers(1, 300)).astype(float)
+    dense = rqa.line_distributions(rqa.recurrence_matrix(series, main.RQA_RADIUS), main.RQA_THEILER_CORRECTOR)
+    for matrix in (rqa.TiledRecurrenceMatrix(series, main.RQA_RADIUS, tile_size=32),
+                   rqa.CategoricalRecurrence(series, main.RQA_RADIUS)):
+        for mine, reference in zip(matrix.line_distributions(main.RQA_THEILER_CORRECTOR), dense):
+            np.testing.assert_array_equal(np.trim_zeros(np.asarray(mine), 'b'),
+                                          np.trim_zeros(np.asarray(reference), 'b'))
+
+
+def test_blocks_add_up_without_the_pairs_between_them():
+    rng = np.random.default_rng(0)
+    blocks = [rng.integers(0, 4, size).astype(float) for size in (12, 1, 30)]
+    matrices = [rqa.recurrence_matrix(block, main.RQA_RADIUS) for block in blocks]
+    result = rqa.RQAResult.from_blocks(matrices, main.RQA_THEILER_CORRECTOR)
+
+    # the block diagonal matrix has the same lines (white ones aside, which would run through the gaps)
+    whole = np.zeros((43, 43), dtype=bool)
+    for start, matrix in zip((0, 12, 13), matrices):
+        whole[start:start + len(matrix), start:start + len(matrix)] = matrix
+    reference = rqa.RQAResult.from_matrix(whole, main.RQA_THEILER_CORRECTOR)
+    np.testing.assert_array_equal(np.trim_zeros(result.diagonal_frequency_distribution, 'b'),
+                                  np.trim_zeros(reference.diagonal_frequency_distribution, 'b'))
+    np.testing.assert_array_equal(np.trim_zeros(result.vertical_frequency_distribution, 'b'),
+                                  np.trim_zeros(reference.vertical_frequency_distribution, 'b'))
+    assert result.number_of_recurrence_points == reference.number_of_recurrence_points
+    assert result.recurrence_rate == reference.number_of_recurrence_points / (12 ** 2 + 1 + 30 ** 2)
+    single = rqa.RQAResult.from_matrix(matrices[2], main.RQA_THEILER_CORRECTOR)
+    assert main.rqa_result_to_dict(rqa.RQAResult.from_blocks(matrices[2:])) == main.rqa_result_to_dict(single)
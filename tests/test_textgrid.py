@@ -0,0 +1,83 @@
+import builtins
+import glob
+import os
+
+import pytest
+from praatclasses import praat, open_textgrid, read_textgrid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHORT_FORMAT = '''File type = "ooTextFile"
+Object class = "TextGrid"
+
+0
+2.5
+<exists>
+2
+"IntervalTier"
+"gaze"
+0
+2.5
+3
+0
+0.12345
+"1"
+0.12345
+1.7
+""
+1.7
+2.5
+"4  "
+"TextTier"
+"events"
+0
+2.5
+2
+0.5
+"a"
+1.25
+"b"
+'''
+
+
+@pytest.fixture
+def old_reader(monkeypatch):
+    # TextGrid.read opens its files with mode 'rU', which Python 3.11 no longer accepts
+    monkeypatch.setattr(praat, 'open', lambda filename, mode='r': builtins.open(filename, mode.replace('U', '')),
+                        raising=False)
+
+    def read(path):
+        grid = praat.TextGrid()
+        grid.read(path)
+        return grid
+    return read
+
+
+def content(grid):
+    tiers = []
+    for tier in grid:
+        if isinstance(tier, praat.PointTier):
+            tiers.append((tier.name(), [(point.time(), point.mark()) for point in tier]))
+        else:
+            tiers.append((tier.name(), tier.xmin(), tier.xmax(),
+                          [(interval.xmin(), interval.xmax(), interval.mark()) for interval in tier]))
+    return grid.xmin(), grid.xmax(), tiers
+
+
+@pytest.mark.parametrize('path', sorted(glob.glob(os.path.join(ROOT, 'VPs', '*', '*.TextGrid'))),
+                         ids=os.path.basename)
+def test_readers_agree_with_textgrid_read(path, old_reader):
+    expected = content(old_reader(path))
+    assert content(read_textgrid(path)) == expected
+    with open_textgrid(path) as grid:
+        assert content(grid) == expected
+
+
+def test_short_format(tmp_path, old_reader):
+    path = str(tmp_path / 'short.TextGrid')
+    with open(path, 'w') as file:
+        file.write(SHORT_FORMAT)
+    expected = content(old_reader(path))
+    assert expected[2][0][3][0] == (0.0, 0.123, '1')
+    assert content(read_textgrid(path)) == expected
+    with open_textgrid(path) as grid:
+        assert content(grid) == expected
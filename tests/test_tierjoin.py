@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from praatclasses import Interval, IntervalTier
+
+from tierjoin import joined_marks, sweep_join
+
+
+def random_tier(rng, name, overlapping):
+    # intervals in time order; overlapping ones start anywhere and may reach over their successors
+    count = int(rng.integers(0, 15))
+    if overlapping:
+        xmins = np.sort(rng.integers(0, 100, count)).astype(float)
+        xmaxs = xmins + rng.integers(1, 30, count)
+    else:
+        bounds = np.cumsum(rng.integers(1, 8, count + 1)).astype(float)
+        xmins, xmaxs = bounds[:-1], bounds[1:]
+    tier = IntervalTier(name)
+    for n, (xmin, xmax) in enumerate(zip(xmins.tolist(), xmaxs.tolist())):
+        tier.append(Interval(xmin, xmax, '' if n % 3 == 2 else '%s%d' % (name, n)))
+    return tier
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_sweep_join_finds_every_overlap(seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(50):
+        reference = random_tier(rng, 'r', rng.random() < 0.5)
+        tiers = [random_tier(rng, 'a', False), random_tier(rng, 'b', True)]
+        for tier, (first, stop) in zip(tiers, sweep_join(reference, tiers)):
+            for i, interval in enumerate(reference):
+                overlaps = {j for j, other in enumerate(tier)
+                            if other.xmin() < interval.xmax() and other.xmax() > interval.xmin()}
+                found = set(range(first[i], stop[i]))
+                if tier.name() == 'a':
+                    assert found == overlaps
+                else:
+                    # with overlaps in the tier, intervals nested in an earlier one may be included as well
+                    assert overlaps <= found
+                    for j in found - overlaps:
+                        assert any(tier[k].xmax() >= tier[j].xmax() for k in range(first[i], j))
+
+
+def test_joined_marks_skip_empty_marks():
+    tier = IntervalTier('words')
+    for xmin, xmax, mark in ((0, 1, 'so'), (1, 2, ''), (2, 3, 'what')):
+        tier.append(Interval(xmin, xmax, mark))
+    reference = IntervalTier('gaze')
+    for xmin, xmax in ((0.5, 2.5), (2.5, 3), (3, 4)):
+        reference.append(Interval(xmin, xmax, '1'))
+    (first, stop), = sweep_join(reference, [tier])
+    assert joined_marks(tier, first, stop) == ['so what', 'what', '']
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+import rqa
+from windowed import SlidingWindowRQA
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_sliding_windows_match_every_slice(seed):
+    # the incrementally updated histograms of every window against line_distributions of its matrix
+    rng = np.random.default_rng(seed)
+    if seed % 2:
+        series, radius = rng.integers(1, 5, size=80).astype(np.float64), 0.65
+    else:
+        series, radius = rng.normal(size=80), 0.8
+    window, theiler_corrector = int(rng.integers(1, 30)), seed % 3
+    starts = []
+    for start, result in SlidingWindowRQA(series, radius, window, theiler_corrector).windows():
+        matrix = rqa.recurrence_matrix(series[start:start + window], radius)
+        recurrence_points, diagonal, vertical, white = rqa.line_distributions(matrix, theiler_corrector)
+        assert int(result.recurrence_points.sum()) == int(recurrence_points.sum())
+        assert result.diagonal_frequency_distribution.tolist() == diagonal.tolist()
+        assert result.vertical_frequency_distribution.tolist() == vertical.tolist()
+        assert result.white_vertical_frequency_distribution.tolist() == white.tolist()
+        starts.append(start)
+    assert starts == list(range(len(series) - window + 1))
@@ -0,0 +1,58 @@
+import numpy as np
+
+from praatclasses import ArrayIntervalTier
+
+
+def interval_bounds(interval_tier):
+    # (xmins, xmaxs) of an interval tier as float arrays
+    if isinstance(interval_tier, ArrayIntervalTier):
+        return (np.frombuffer(interval_tier.xmins(), dtype=np.float64),
+                np.frombuffer(interval_tier.xmaxs(), dtype=np.float64))
+    return (np.array([interval.xmin() for interval in interval_tier], dtype=np.float64),
+            np.array([interval.xmax() for interval in interval_tier], dtype=np.float64))
+
+
+def merge_counts(values, boundaries, side='left'):
+    # np.searchsorted(boundaries, values, side) for two sorted arrays, as one sweep over both: a stable sort of
+    # two sorted runs is a single linear merge, after which every value has the boundaries before it in front
+    if side == 'right':
+        merged, offset = np.concatenate([boundaries, values]), len(boundaries)
+    else:
+        merged, offset = np.concatenate([values, boundaries]), 0
+    rank = np.empty(len(merged), dtype=np.int64)
+    rank[np.argsort(merged, kind='stable')] = np.arange(len(merged))
+    return rank[offset:offset + len(values)] - np.arange(len(values))
+
+
+def sweep_join(reference, tiers):
+    # for every interval of the reference tier the intervals of each of the other tiers that overlap it (share
+    # more than a boundary with it), as a (first, stop) pair of index arrays per tier: the overlapping intervals
+    # of tier k are tiers[k][first[i]:stop[i]]. All tiers are swept once in time order, so the join takes
+    # O(total intervals) for any number of tiers.
+    #
+    # Tiers have to be sorted by time, as clean() leaves them. Overlapping intervals within the other tiers
+    # (which clean() reports) are handled with the running maximum of their ends, so their ranges may include
+    # intervals nested in an earlier one. The reference keeps its own ends; if its intervals overlap, these are
+    # not sorted and are looked up by binary search instead of the sweep.
+    xmins, xmaxs = interval_bounds(reference)
+    sorted_ends = bool(np.all(xmaxs[1:] >= xmaxs[:-1]))
+    joined = []
+    for tier in tiers:
+        starts, ends = interval_bounds(tier)
+        ends = np.maximum.accumulate(ends) if len(ends) else ends
+        # the first interval ending after the reference starts, and the first one starting at or after its end
+        first = merge_counts(xmins, ends, 'right')
+        stop = merge_counts(xmaxs, starts, 'left') if sorted_ends else np.searchsorted(starts, xmaxs, 'left')
+        stop = np.maximum(stop, first)
+        joined.append((first, stop))
+    return joined
+
+
+def joined_marks(interval_tier, first, stop, separator=' '):
+    # the non-empty marks of tier[first[i]:stop[i]] of every reference interval, joined by separator
+    if isinstance(interval_tier, ArrayIntervalTier):
+        marks = interval_tier.marks()
+    else:
+        marks = [interval.mark() for interval in interval_tier]
+    return [separator.join(mark for mark in marks[start:end] if mark)
+            for start, end in zip(first.tolist(), stop.tolist())]
@@ -5,4 +5,9 @@ from .praat import TextGrid
 from .praat import IntervalTier
 from .praat import PointTier
 from .praat import Interval
-from .praat import Point
\ No newline at end of file
+from .praat import Point
+from .fastread import ArrayIntervalTier
+from .fastread import IntervalView
+from .fastread import read_textgrid
+from .fastread import LazyTextGrid
+from .fastread import open_textgrid
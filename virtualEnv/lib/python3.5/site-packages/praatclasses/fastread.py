@@ -0,0 +1,515 @@
+########################################################################################
+##  Single-pass TextGrid reader                                                       ##
+##                                                                                    ##
+## - the whole file is read at once and split into tokens with one regular expression ##
+##   (quoted strings, <flags> and numbers), so long and short formats look the same   ##
+## - IntervalTiers are stored column-wise (array('d') for xmin/xmax, array('i') for   ##
+##   mark codes into an interned mark table); Interval objects are only created as    ##
+##   lazy views when a caller iterates or indexes the tier                            ##
+## - open_textgrid maps the file and only indexes where each tier starts and ends;    ##
+##   a tier is tokenized and parsed the first time it is accessed                     ##
+########################################################################################
+
+import mmap
+import re
+from array import array
+from itertools import islice, repeat
+from operator import le
+
+from .praat import TextGrid, IntervalTier, PointTier, Interval, Point
+
+## works on the raw bytes: skips keys and layout in one go, then captures a quoted string
+## ("" is an escaped quote), a flag like <exists> or a number; bracketed indices
+## ("item [1]:", "intervals [3]:") match without a group and are dropped
+TOKEN = re.compile(br'[^"<\[\d.+-]*(?:("[^"]*(?:""[^"]*)*"|<[a-z]+>|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)'
+                   br'|\[[^\]\n]*\])')
+## a single quoted string; the tiers are found by skipping as many of them as a tier has marks
+QUOTED = re.compile(br'"[^"]*(?:""[^"]*)*"')
+
+
+def encode(data):
+    """returns the raw bytes of a Praat text file as UTF-8 (Praat also writes UTF-16 with BOM)"""
+    if data[:2] in (b'\xff\xfe', b'\xfe\xff'):
+        return data.decode('utf-16').encode('utf-8')
+    if data[:3] == b'\xef\xbb\xbf':
+        return data[3:]
+    return data
+
+
+def tokenize(data):
+    """returns the list of value tokens (bytes, strings still quoted) of a Praat text file"""
+    return [token for token in TOKEN.findall(data) if token]
+
+
+def unquote(token):
+    """strips the quote characters surrounding a string token, resolves "" escapes and decodes it"""
+    if len(token) < 2 or token[:1] != b'"' or token[-1:] != b'"':
+        raise ValueError('expected a quoted string, got %r' % token)
+    return token[1:-1].replace(b'""', b'"').decode('utf-8')
+
+
+def number_parser(precision):
+    """returns the function used to turn a column of number tokens into an array of floats
+
+    values are rounded to precision digits like TextGrid.read does, but only if some token
+    of the column actually carries more digits (rounding the others would not change them)"""
+    if precision is None:
+        return lambda tokens: array('d', map(float, tokens))
+    digits = re.compile(br'\.\d{%d}|[eE]' % (precision + 1))
+
+    def num(tokens):
+        if digits.search(b' '.join(tokens)) is None:
+            return array('d', map(float, tokens))
+        return array('d', map(round, map(float, tokens), repeat(precision)))
+    return num
+
+
+class IntervalView(Interval):
+    """lazy Interval reading from (and writing back to) one row of an ArrayIntervalTier
+
+    views are positional: deleting or sorting intervals of the tier invalidates them"""
+
+    def __init__(self, tier, i):
+        self._tier = tier
+        self._i = i
+
+    def __str__(self):
+        return '<Interval "%s" %f:%f>' % (self.mark(), self.xmin(), self.xmax())
+
+    def xmin(self):
+        return self._tier._xmins[self._i]
+
+    def xmax(self):
+        return self._tier._xmaxs[self._i]
+
+    def mark(self):
+        return self._tier._labels[self._tier._codes[self._i]]
+
+    def code(self):
+        """returns the index of the mark in the tier's mark table"""
+        return self._tier._codes[self._i]
+
+    def change_offset(self, offset):
+        self._tier._xmins[self._i] += offset
+        self._tier._xmaxs[self._i] += offset
+
+    def change_text(self, text):
+        self._tier.set_mark(self._i, text)
+
+
+class ArrayIntervalTier(IntervalTier):
+    """IntervalTier stored as parallel xmin/xmax columns plus an interned mark table"""
+
+    def __init__(self, name = '', xmin = 0, xmax = 0, xmins = None, xmaxs = None, codes = None, labels = None):
+        self._name = name
+        self._xmin = xmin
+        self._xmax = xmax
+        self._xmins = xmins if xmins is not None else array('d')
+        self._xmaxs = xmaxs if xmaxs is not None else array('d')
+        self._codes = codes if codes is not None else array('i')
+        self._labels = labels if labels is not None else []      ## code -> mark
+        self._index = dict((label, code) for code, label in enumerate(self._labels))
+
+    def __str__(self):
+        return '<IntervalTier "%s" with %d intervals>' % (self._name, len(self._codes))
+
+    def __iter__(self):
+        return (IntervalView(self, i) for i in range(len(self._codes)))
+
+    def __len__(self):
+        return len(self._codes)
+
+    def __getitem__(self, i):
+        """returns the (i+1)th interval"""
+        if isinstance(i, slice):
+            return [IntervalView(self, j) for j in range(*i.indices(len(self._codes)))]
+        if i < 0:
+            i += len(self._codes)
+        if not 0 <= i < len(self._codes):
+            raise IndexError('interval index out of range')
+        return IntervalView(self, i)
+
+    def xmin(self):
+        return self._xmin
+
+    def xmax(self):
+        return self._xmax
+
+    def name(self):
+        return self._name
+
+    def rename(self, newname):
+        """assigns new name to tier"""
+        self._name = newname
+
+    ## column access (no Interval objects are created)
+
+    def xmins(self):
+        """returns the array of interval start times"""
+        return self._xmins
+
+    def xmaxs(self):
+        """returns the array of interval end times"""
+        return self._xmaxs
+
+    def codes(self):
+        """returns the array of mark codes (indices into labels())"""
+        return self._codes
+
+    def labels(self):
+        """returns the interned mark table"""
+        return self._labels
+
+    def marks(self):
+        """returns the marks of all intervals as a list of strings"""
+        labels = self._labels
+        return [labels[code] for code in self._codes]
+
+    def intern(self, mark):
+        """returns the code of mark, adding it to the mark table if necessary"""
+        code = self._index.get(mark)
+        if code is None:
+            code = self._index[mark] = len(self._labels)
+            self._labels.append(mark)
+        return code
+
+    def set_mark(self, i, mark):
+        self._codes[i] = self.intern(mark)
+
+    def append(self, interval):
+        self._xmins.append(interval.xmin())
+        self._xmaxs.append(interval.xmax())
+        self._codes.append(self.intern(interval.mark()))
+        self._xmax = max(interval.xmax(), self._xmax)
+        self._xmin = min(interval.xmin(), self._xmin)
+
+    def select(self, keep):
+        """keeps only the intervals whose indices are listed (in order) in keep"""
+        self._xmins = array('d', [self._xmins[i] for i in keep])
+        self._xmaxs = array('d', [self._xmaxs[i] for i in keep])
+        self._codes = array('i', [self._codes[i] for i in keep])
+
+    def read(self, file):
+        """reads IntervalTier from Praat .IntervalTier file (long or short format)"""
+        with open(file, 'rb') as text:
+            tokens = tokenize(encode(text.read()))
+        if len(tokens) < 5 or unquote(tokens[1]) != 'IntervalTier':
+            raise ValueError('%s is not an IntervalTier file' % file)
+        num = number_parser(None)
+        self._xmin, self._xmax = num(tokens[2:4])
+        self._xmins, self._xmaxs, self._codes, self._labels = read_interval_columns(tokens, 5, int(tokens[4]), num)
+        self._index = dict((label, code) for code, label in enumerate(self._labels))
+
+    def write(self, file):
+        text = open(file, 'w')
+        text.write('File type = "ooTextFile"\n')
+        text.write('Object class = "IntervalTier"\n\n')
+        text.write('xmin = %f\n' % self._xmin)
+        text.write('xmax = %f\n' % self._xmax)
+        text.write('intervals: size = %d\n' % len(self))
+        for n, interval in enumerate(self, 1):
+            text.write('intervals [%d]:\n' % n)
+            text.write('\txmin = %f\n' % interval.xmin())
+            text.write('\txmax = %f\n' % interval.xmax())
+            text.write('\ttext = "%s"\n' % interval.mark().replace('"', '""'))
+        text.close()
+
+    def sort_intervals(self, par="xmin"):
+        """sorts intervals according to given parameter values.  Parameter can be xmin (default), xmax, or text."""
+        if par == "xmin":
+            key = self._xmins.__getitem__
+        elif par == "xmax":
+            key = self._xmaxs.__getitem__
+        elif par == "text":
+            key = lambda i: self._labels[self._codes[i]]
+        else:
+            raise ValueError("Invalid parameter for function sort_intervals.")
+        self.select(sorted(range(len(self._codes)), key=key))
+
+    def extend(self, newmin, newmax):
+        if newmin > self._xmin:
+            raise ValueError("New minimum of tier exceeds old minimum.")
+        if newmax < self._xmax:
+            raise ValueError("New maximum of tier is less than old maximum.")
+        self._xmin = newmin
+        self._xmax = newmax
+        ## add new intervals at beginning and end
+        self.sort_intervals()
+        first, last = self._xmins[0], self._xmaxs[-1]
+        sp = self.intern("sp")
+        self._xmins.insert(0, newmin)
+        self._xmaxs.insert(0, first)
+        self._codes.insert(0, sp)
+        self._xmins.append(last)
+        self._xmaxs.append(newmax)
+        self._codes.append(sp)
+
+    def tidyup(self):
+        """inserts empty intervals in the gaps between transcription intervals"""
+        overlaps = self.clean(empty=False, gap_mark="sp")
+        for first, second, name in overlaps:
+            print("WARNING!!!  Overlapping intervals %s and %s on tier %s!!!" % (first, second, name))
+        return overlaps
+
+    def change_offset(self, offset):
+        self._xmin += offset
+        self._xmax += offset
+        self._xmins = array('d', [x + offset for x in self._xmins])
+        self._xmaxs = array('d', [x + offset for x in self._xmaxs])
+
+    def delete_empty(self):
+        self.clean()
+
+    def delete_doubles(self):
+        # remove redundant annotations (subsequent intervals with the same mark)
+        self.clean(empty=False, doubles=True)
+
+    def clean(self, empty=True, doubles=False, truncate=None, gap_mark=None):
+        """cleans the tier in one compacting pass and returns the overlapping neighbours
+
+        the intervals are put in time order (only sorted if they are not already); truncate cuts
+        every mark to that many characters, which only rewrites the mark table; empty drops the
+        intervals without a mark and doubles the ones with the same mark as the interval before
+        them; gap_mark (e.g. "sp", like tidyup) fills the gaps between the remaining intervals.
+        Returns (interval, following interval, tier name) for every pair of remaining neighbours
+        that overlap. Linear in the number of intervals, apart from sorting an unordered tier."""
+        if not all(map(le, self._xmins, islice(self._xmins, 1, None))):
+            self.sort_intervals()
+        xmins, xmaxs, codes = self._xmins, self._xmaxs, self._codes
+
+        if truncate is not None:
+            lookup = array('i', [self.intern(label[:truncate]) for label in list(self._labels)])
+            codes = array('i', map(lookup.__getitem__, codes))
+
+        keep = range(len(codes))
+        empty_code = self._index.get("")
+        if empty and empty_code is not None:
+            keep = [i for i in keep if codes[i] != empty_code]
+        if doubles:
+            keep = [i for j, i in enumerate(keep) if j == 0 or codes[i] != codes[keep[j-1]]]
+
+        xmins = array('d', map(xmins.__getitem__, keep))
+        xmaxs = array('d', map(xmaxs.__getitem__, keep))
+        codes = array('i', map(codes.__getitem__, keep))
+        labels = self._labels
+        overlaps = [(Interval(xmins[j-1], xmaxs[j-1], labels[codes[j-1]]),
+                     Interval(xmins[j], xmaxs[j], labels[codes[j]]), self._name)
+                    for j, (end, start) in enumerate(zip(xmaxs, islice(xmins, 1, None)), 1) if end > start]
+
+        if gap_mark is not None:
+            ## the gap before interval j is spliced in along with the intervals up to j
+            gaps = [j for j, (end, start) in enumerate(zip(xmaxs, islice(xmins, 1, None)), 1) if end < start]
+            if gaps:
+                gap = self.intern(gap_mark)
+                newmins, newmaxs, newcodes = array('d'), array('d'), array('i')
+                first = 0
+                for j in gaps + [len(codes)]:
+                    newmins.extend(xmins[first:j])
+                    newmaxs.extend(xmaxs[first:j])
+                    newcodes.extend(codes[first:j])
+                    if j < len(codes):
+                        newmins.append(xmaxs[j-1])
+                        newmaxs.append(xmins[j])
+                        newcodes.append(gap)
+                    first = j
+                xmins, xmaxs, codes = newmins, newmaxs, newcodes
+        self._xmins, self._xmaxs, self._codes = xmins, xmaxs, codes
+        return overlaps
+
+
+def read_interval_columns(tokens, p, n, num):
+    """turns the 3*n tokens starting at p into xmin/xmax columns, mark codes and a mark table"""
+    end = p + 3 * n
+    if end > len(tokens):
+        raise ValueError('TextGrid ends inside a tier')
+    xmins = num(tokens[p:end:3])
+    xmaxs = num(tokens[p+1:end:3])
+    raw = tokens[p+2:end:3]
+    index = dict((token, code) for code, token in enumerate(dict.fromkeys(raw)))
+    labels = [unquote(token) for token in index]
+    codes = array('i', map(index.__getitem__, raw))
+    return xmins, xmaxs, codes, labels
+
+
+def parse_tier(tokens, p, num):
+    """parses the tier starting at token p; returns the tier and the position after it"""
+    tclass = unquote(tokens[p])
+    name = unquote(tokens[p+1])
+    tmin, tmax = num(tokens[p+2:p+4])
+    n = int(tokens[p+4])
+    p += 5
+    if tclass == 'IntervalTier':
+        xmins, xmaxs, codes, labels = read_interval_columns(tokens, p, n, num)
+        return ArrayIntervalTier(name, tmin, tmax, xmins, xmaxs, codes, labels), p + 3 * n
+    tier = PointTier(name, tmin, tmax)
+    for time, mark in zip(num(tokens[p:p+2*n:2]), tokens[p+1:p+2*n:2]):
+        tier.append(Point(time, unquote(mark)))
+    return tier, p + 2 * n
+
+
+def read_textgrid(filename, precision = 3):
+    """reads TextGrid from Praat .TextGrid file (long or short format) in a single pass
+
+    interval tiers come back as ArrayIntervalTiers; times are rounded to precision digits
+    like TextGrid.read does (precision=None keeps them as written)"""
+    with open(filename, 'rb') as text:
+        tokens = tokenize(encode(text.read()))
+    if len(tokens) < 4 or tokens[0] != b'"ooTextFile"' or tokens[1] != b'"TextGrid"':
+        raise ValueError('%s is not a Praat TextGrid file' % filename)
+    num = number_parser(precision)
+    grid = TextGrid()
+    xmin, xmax = num(tokens[2:4])
+    if len(tokens) > 5 and tokens[4] == b'<exists>':
+        m = int(tokens[5])
+        p = 6
+        for i in range(m):
+            tier, p = parse_tier(tokens, p, num)
+            grid.append(tier)
+    grid.change_times(xmin, xmax)
+    return grid
+
+
+def header_tokens(data, pos, n):
+    """returns the next n value tokens of data from byte pos on, with the position of the first
+    one and the position after the last one"""
+    tokens = []
+    start = None
+    while len(tokens) < n:
+        match = TOKEN.match(data, pos)
+        if match is None or match.end() == pos:
+            raise ValueError('TextGrid ends inside a header')
+        pos = match.end()
+        if match.group(1) is not None:
+            if start is None:
+                start = match.start(1)
+            tokens.append(match.group(1))
+    return tokens, start, pos
+
+
+class LazyTextGrid(TextGrid):
+    """TextGrid read through mmap whose tiers are parsed on first access
+
+    opening only reads the file header and the header of every tier (class, name, size) and
+    skips over the marks to the next tier, so tiers that are never accessed are never
+    tokenized. Tiers can be accessed by index or by name; the mapping is released once all
+    tiers are parsed or on close()"""
+
+    def __init__(self, filename, precision = 3):
+        TextGrid.__init__(self, filename)
+        self._num = number_parser(precision)
+        self._data = None
+        with open(filename, 'rb') as text:
+            bom = text.read(3)
+            if bom[:2] in (b'\xff\xfe', b'\xfe\xff'):
+                ## UTF-16 cannot be scanned as bytes; such files are converted in memory
+                text.seek(0)
+                self._data = encode(text.read())
+            elif bom:
+                self._data = mmap.mmap(text.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._index = self._scan(b'' if self._data is None else self._data, 3 if bom == b'\xef\xbb\xbf' else 0)
+        except ValueError:
+            self.close()
+            raise
+        self._tiers = [None] * len(self._index)
+        if not self._tiers:
+            self.close()
+
+    def _scan(self, data, pos):
+        """returns (class, name, first byte, byte after the tier) of every tier"""
+        try:
+            head, _, pos = header_tokens(data, pos, 4)
+        except ValueError:
+            head = []
+        if head[:2] != [b'"ooTextFile"', b'"TextGrid"']:
+            raise ValueError('%s is not a Praat TextGrid file' % self.name())
+        self.change_times(*self._num(head[2:4]))
+        match = TOKEN.match(data, pos)
+        while match is not None and match.group(1) is None and match.end() > pos:
+            pos = match.end()
+            match = TOKEN.match(data, pos)
+        if match is None or match.group(1) != b'<exists>':
+            return []
+        (m,), _, pos = header_tokens(data, match.end(), 1)
+        index = []
+        for i in range(int(m)):
+            (tclass, name, tmin, tmax, n), start, pos = header_tokens(data, pos, 5)
+            ## one mark per interval or point
+            n = int(n)
+            if n:
+                last = next(islice(QUOTED.finditer(data, pos), n - 1, None), None)
+                if last is None:
+                    raise ValueError('TextGrid ends inside a tier')
+                pos = last.end()
+            index.append((unquote(tclass), unquote(name), start, pos))
+        return index
+
+    def __str__(self):
+        return '<TextGrid with %d tiers>' % len(self._tiers)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self._tiers)))
+
+    def __len__(self):
+        return len(self._tiers)
+
+    def __getitem__(self, i):
+        """returns the (i+1)th tier, or the first tier called i"""
+        if isinstance(i, str):
+            i = self.tier_index(i)
+        elif i < 0:
+            i += len(self._tiers)
+        if not 0 <= i < len(self._tiers):
+            raise IndexError('tier index out of range')
+        if self._tiers[i] is None:
+            if self._data is None:
+                raise ValueError('TextGrid %s is closed' % self.name())
+            tclass, name, start, stop = self._index[i]
+            self._tiers[i], _ = parse_tier(tokenize(self._data[start:stop]), 0, self._num)
+            if None not in self._tiers:
+                self.close()
+        return self._tiers[i]
+
+    def tier_names(self):
+        return [name for tclass, name, start, stop in self._index]
+
+    def tier_index(self, name):
+        """returns the index of the first tier called name"""
+        for i, (tclass, tname, start, stop) in enumerate(self._index):
+            if tname == name:
+                return i
+        raise KeyError('no tier called %r' % name)
+
+    def parsed(self):
+        """returns the indices of the tiers parsed so far"""
+        return [i for i, tier in enumerate(self._tiers) if tier is not None]
+
+    def append(self, tier):
+        TextGrid.append(self, tier)
+        self._tiers.append(tier)
+        self._index.append((type(tier).__name__, tier.name(), None, None))
+
+    def change_offset(self, offset):
+        self.change_times(self.xmin() + offset, self.xmax() + offset)
+        for tier in self:
+            tier.change_offset(offset)
+
+    def close(self):
+        """releases the file; tiers that were not parsed yet can no longer be accessed"""
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._data = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_textgrid(filename, precision = 3):
+    """opens a Praat .TextGrid file (long or short format) for tier-by-tier reading
+
+    the returned LazyTextGrid only indexes the tiers; each one is parsed like read_textgrid
+    does on first access, so grid[0] of a grid with many tiers only costs that tier"""
+    return LazyTextGrid(filename, precision)
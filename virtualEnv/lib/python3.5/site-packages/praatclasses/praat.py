@@ -405,7 +405,7 @@ class TextGrid:
         text.write('item []:\n')
         for (tier, n) in zip(self.__tiers, list(range(1, self.__n + 1))):
             text.write('\titem [%d]:\n' % n)
-            if tier.__class__ == IntervalTier: 
+            if isinstance(tier, IntervalTier):
                 text.write('\t\tclass = "IntervalTier"\n')
                 text.write('\t\tname = "%s"\n' % tier.name())
                 text.write('\t\txmin = %f\n' % tier.xmin())
@@ -535,24 +535,22 @@ class IntervalTier:
     
     def tidyup(self):
         """inserts empty intervals in the gaps between transcription intervals"""
+        ## sorted once, then the gaps are filled in a single pass over neighbouring intervals
         self.sort_intervals()
-        z = 0
-        end = len(self.__intervals) - 1
+        intervals = []
         overlaps = []
-        while z < end:  ## (only go up to second-to-last interval)
-            i = self.__intervals[z]
-            if i.xmax() != self.__intervals[z+1].xmin():
+        for i, following in zip(self.__intervals, self.__intervals[1:] + [None]):
+            intervals.append(i)
+            if following is None or i.xmax() == following.xmin():
+                continue
+            if i.xmax() < following.xmin():
                 ## insert empty interval if xmax of interval and xmin of following interval do not coincide
-                if i.xmax() < self.__intervals[z+1].xmin():
-                    self.__intervals.append(Interval(i.xmax(), self.__intervals[z+1].xmin(), "sp"))
-                    self.__n = len(self.__intervals)
-                    self.sort_intervals()
-                    ## update iteration range
-                    end = len(self.__intervals) - 1
-                else:   ## overlapping interval boundaries
-                    overlaps.append((i, self.__intervals[z+1], self.__name))
-                    print("WARNING!!!  Overlapping intervals %s and %s on tier %s!!!" % (i, self.__intervals[z+1], self.__name))
-            z += 1
+                intervals.append(Interval(i.xmax(), following.xmin(), "sp"))
+            else:   ## overlapping interval boundaries
+                overlaps.append((i, following, self.__name))
+                print("WARNING!!!  Overlapping intervals %s and %s on tier %s!!!" % (i, following, self.__name))
+        self.__intervals = intervals
+        self.__n = len(self.__intervals)
         return overlaps
 
     def change_offset(self, offset):
@@ -562,23 +560,17 @@ class IntervalTier:
             i.change_offset(offset)
 
     def delete_empty(self):
-        for interval in self:
-            if interval.mark() == "":
-                self.__intervals.remove(interval)
+        ## (removing while iterating skipped the interval after every removed one)
+        self.__intervals = [interval for interval in self.__intervals if interval.mark() != ""]
         self.__n = len(self.__intervals)
 
     def delete_doubles(self):
-
-        # remove redundant annotations
-        prevInterval = None
-        for interval in self:
-            if not prevInterval:
-                prevInterval = interval
-                continue
-            elif interval.mark() == prevInterval.mark():
-                print('deleting')
-                self.__intervals.remove(interval)
-                prevInterval = interval
+        # remove redundant annotations (subsequent intervals with the same mark)
+        intervals = []
+        for interval in self.__intervals:
+            if not intervals or interval.mark() != intervals[-1].mark():
+                intervals.append(interval)
+        self.__intervals = intervals
         self.__n = len(self.__intervals)
 
 
@@ -688,5 +680,11 @@ class Point:
     def time(self):
         return self.__time
 
+    def xmin(self):
+        return self.__time
+
+    def xmax(self):
+        return self.__time
+
     def mark(self):
         return self.__mark
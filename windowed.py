@@ -0,0 +1,231 @@
+import argparse
+import csv
+import os
+
+import numpy as np
+
+import rqa
+from main import (ANALYSEN_PATH, CACHE_PATH, RQA_LINE_LENGTHS, RQA_RADIUS, RQA_THEILER_CORRECTOR,
+                  iter_participants, load_participant, recurrence_points, rqa_result_to_dict, run_jobs)
+
+WINDOWS_PATH = 'windows'
+
+
+def _run_starts(cells):
+    # indices where the runs of equal values of a 1d boolean array start
+    return np.flatnonzero(np.concatenate([[True], cells[1:] != cells[:-1]]))
+
+
+class _LineEnds:
+    """the runs at both ends of a set of lines of a sliding recurrence window
+
+    A line is a column or a diagonal of the window's recurrence matrix; cell(lines, positions) gives its
+    cells. When the window moves on, every line loses its first cell and gains one after its last, so only
+    the runs at its two ends change: their values and lengths are all that is kept of a line. A first run
+    that loses its last cell is found anew from the series, in steps that double, which costs its length
+    once. Runs of recurrent cells are counted into histogram[1], the others into histogram[0].
+    """
+
+    def __init__(self, cell, lines, weights, size):
+        self.cell = cell
+        self.lines = np.array(lines, dtype=np.int64)
+        self.weights = np.array(weights, dtype=np.int64)
+        self.histogram = np.zeros((2, size + 1), dtype=np.int64)
+        # positions of the last cell of every line and of the last cell of its first run
+        self.last = np.zeros(len(self.lines), dtype=np.int64)
+        self.first_end = np.zeros(len(self.lines), dtype=np.int64)
+        self.last_value = np.zeros(len(self.lines), dtype=bool)
+        self.last_length = np.zeros(len(self.lines), dtype=np.int64)
+
+    def _count(self, values, lengths, weights):
+        np.add.at(self.histogram, (values.astype(np.intp), lengths), weights)
+
+    def _cells(self, slot, first, last):
+        return self.cell(np.full(last - first + 1, self.lines[slot]), np.arange(first, last + 1))
+
+    def enter(self, slot, line, first, last):
+        # line takes slot with its cells first .. last; returns the cells
+        self.lines[slot] = line
+        cells = self._cells(slot, first, last)
+        starts = _run_starts(cells)
+        lengths = np.diff(np.append(starts, len(cells)))
+        self._count(cells[starts], lengths, np.full(len(starts), self.weights[slot]))
+        self.last[slot] = last
+        self.first_end[slot] = first + lengths[0] - 1
+        self.last_value[slot] = cells[-1]
+        self.last_length[slot] = lengths[-1]
+        return cells
+
+    def leave(self, slot, first):
+        # the line in slot, from cell first on, leaves; returns its cells
+        cells = self._cells(slot, first, self.last[slot])
+        starts = _run_starts(cells)
+        self._count(cells[starts], np.diff(np.append(starts, len(cells))), np.full(len(starts), -self.weights[slot]))
+        return cells
+
+    def slide(self, slots, first):
+        # the lines in slots lose their cell first and gain the one after their last
+        lines, last, end, weights = self.lines[slots], self.last[slots], self.first_end[slots], self.weights[slots]
+
+        # the first run gets shorter, and so does the last run if it is the same
+        values = self.cell(lines, np.full(len(lines), first))
+        self._count(values, end - first + 1, -weights)
+        self._count(values, end - first, weights)
+        length = self.last_length[slots] - (end == last)
+
+        # the last run grows by the new cell or a new one starts
+        cells = self.cell(lines, last + 1)
+        grows = (length > 0) & (cells == self.last_value[slots])
+        self._count(cells[grows], length[grows], -weights[grows])
+        length = np.where(grows, length + 1, 1)
+        self._count(cells, length, weights)
+        self.last_length[slots] = length
+        self.last_value[slots] = cells
+
+        # a first run that reached the end takes the new cell too; one without cells left is found anew
+        end = np.where(grows & (end == last) & (end > first), last + 1, end)
+        empty = np.flatnonzero(end == first)
+        end[empty] = self._run_ends(lines[empty], first + 1, last[empty] + 1)
+        self.first_end[slots] = end
+        self.last[slots] = last + 1
+
+    def _run_ends(self, lines, first, last):
+        # position of the last cell of the run that starts at cell first of each of the lines
+        values = self.cell(lines, np.full(len(lines), first))
+        ends = last.copy()
+        pending, start, step = np.arange(len(lines)), first + 1, 8
+        while len(pending):
+            positions = np.minimum(start + np.arange(step)[None, :], last[pending, None])
+            changed = self.cell(lines[pending, None], positions) != values[pending, None]
+            found = changed.any(axis=1)
+            ends[pending[found]] = positions[found, changed[found].argmax(axis=1)] - 1
+            pending = pending[~found & (start + step <= last[pending])]
+            start, step = start + step, 2 * step
+        return ends
+
+
+class SlidingWindowRQA:
+    """RQA of all windows of a fixed number of consecutive points, updated incrementally
+
+    The windows' recurrence matrices are the principal submatrices of the recurrence matrix of the
+    whole series. When the window moves on by one point, a column leaves, a column enters and every
+    other column and every diagonal loses its first cell and gains a last one, so the line length
+    histograms are updated at the ends of the lines in O(window) instead of recounting O(window^2)
+    cells. Cells are computed from the series when they are needed; by symmetry the vertical lines
+    are read off the columns and the diagonals below the main diagonal are counted with those above
+    it, and memory is O(window).
+    """
+
+    def __init__(self, series, radius, window, theiler_corrector=1):
+        self.series = np.asarray(series, dtype=np.float64)
+        self.window = min(window, len(self.series))
+        self.radius = radius
+        self.theiler_corrector = theiler_corrector
+
+        w = self.window
+        # column j in slot j % w; diagonal d >= 0 in slot d - theiler_corrector
+        self.columns = _LineEnds(self._column_cell, np.arange(w), np.ones(w), w)
+        offsets = np.arange(max(theiler_corrector, 0), w)
+        self.diagonals = _LineEnds(self._diagonal_cell, offsets, np.where(offsets > 0, 2, 1), w)
+
+    def _column_cell(self, columns, rows):
+        return np.square(self.series[rows] - self.series[columns]) < self.radius * self.radius
+
+    def _diagonal_cell(self, offsets, rows):
+        return np.square(self.series[rows] - self.series[rows + offsets]) < self.radius * self.radius
+
+    def windows(self, step=1):
+        # (first point, RQAResult) for the windows starting at 0, step, 2 * step, ... and the last window
+        n, w = len(self.series), self.window
+        if w == 0:
+            return
+        last = n - w
+        self._start()
+        for start in range(0, last + 1):
+            if start > 0:
+                self._slide(start - 1)
+            if start % step == 0 or start == last:
+                yield start, self.result()
+
+    def result(self):
+        w = self.window
+        return rqa.RQAResult(w, w, np.array([self.recurrence_points], dtype=np.uint64),
+                             self.diagonals.histogram[1, 1:].astype(np.uint64),
+                             self.columns.histogram[1, 1:].astype(np.uint64),
+                             self.columns.histogram[0, 1:].astype(np.uint64), **RQA_LINE_LENGTHS)
+
+    def _start(self):
+        w = self.window
+        self.recurrence_points = 0
+        for j in range(w):
+            self.recurrence_points += int(self.columns.enter(j, j, 0, w - 1).sum())
+        for slot, offset in enumerate(self.diagonals.lines.tolist()):
+            self.diagonals.enter(slot, offset, 0, w - 1 - offset)
+
+    def _slide(self, a):
+        # window [a, a + w) -> [a + 1, a + w + 1): column and row a leave, column and row a + w enter
+        w = self.window
+        slot = a % w
+        column = self.columns.leave(slot, a)
+        self.recurrence_points -= 2 * int(column.sum()) - int(column[0])
+        self.columns.slide(np.delete(np.arange(w), slot), a)
+        column = self.columns.enter(slot, a + w, a + 1, a + w)
+        self.recurrence_points += 2 * int(column.sum()) - int(column[-1])
+        self.diagonals.slide(np.arange(len(self.diagonals.lines)), a)
+
+
+def question_windows(points, series, radius, theiler_corrector=1):
+    # (first point, question, question mark, RQAResult) for the points of every ThinkAnswer question
+    questions = np.array([point[1] for point in points])
+    boundaries = np.flatnonzero(questions[1:] != questions[:-1]) + 1
+    for start, stop in zip(np.concatenate([[0], boundaries]), np.concatenate([boundaries, [len(points)]])):
+        block = rqa.recurrence_matrix(series[start:stop], radius)
+        result = rqa.RQAResult.from_matrix(block, theiler_corrector, **RQA_LINE_LENGTHS)
+        yield int(start), points[start][1], points[start][2], result
+
+
+def window_participant(vp_nr, br_path, ta_path, window=None, step=1, radius=RQA_RADIUS,
+                       theiler_corrector=RQA_THEILER_CORRECTOR, cache_path=CACHE_PATH):
+    # writes the metrics of every window of one participant to ANALYSEN_PATH/windows/<vp>_windows.csv;
+    # without a window size there is one window per ThinkAnswer question
+    points = recurrence_points(*load_participant(br_path, ta_path, cache_path))
+    series = np.array([float(point[0]) for point in points])
+
+    if window is None:
+        windows = ((start, question, mark, result)
+                   for start, question, mark, result in question_windows(points, series, radius, theiler_corrector))
+        fieldnames = ['first point', 'points', 'question', 'question mark']
+    else:
+        windows = ((start, None, None, result)
+                   for start, result in SlidingWindowRQA(series, radius, window, theiler_corrector).windows(step))
+        fieldnames = ['first point', 'points']
+
+    os.makedirs(os.path.join(ANALYSEN_PATH, WINDOWS_PATH), exist_ok=True)
+    filename = os.path.join(ANALYSEN_PATH, WINDOWS_PATH, vp_nr + "_windows.csv")
+    with open(filename, 'w', newline='') as csvfile:
+        writer = None
+        for start, question, mark, result in windows:
+            result_dict = rqa_result_to_dict(result)
+            if writer is None:
+                writer = csv.DictWriter(csvfile, fieldnames=fieldnames + list(result_dict.keys()))
+                writer.writeheader()
+            row = dict(result_dict, **{'first point': start, 'points': result.number_of_vectors_x})
+            if question is not None:
+                row.update({'question': question, 'question mark': mark})
+            writer.writerow(row)
+    return filename
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='RQA measures over time: per sliding window of gaze points or per '
+                                                 'ThinkAnswer question, one table per participant in ' +
+                                                 os.path.join(ANALYSEN_PATH, WINDOWS_PATH))
+    parser.add_argument('--window', type=int, help='points per sliding window; one window per question if not given')
+    parser.add_argument('--step', type=int, default=1, help='points between the starts of two sliding windows')
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes')
+    parser.add_argument('--no-cache', action='store_true', help='always parse the TextGrid files')
+    args = parser.parse_args()
+
+    jobs = [(vp_nr, br_path, ta_path, args.window, args.step, RQA_RADIUS, RQA_THEILER_CORRECTOR,
+             None if args.no_cache else CACHE_PATH) for vp_nr, br_path, ta_path in iter_participants()]
+    list(run_jobs(window_participant, jobs, args.workers))